@@ -11,6 +11,7 @@ BMAD GUI 启动脚本
 import sys
 import subprocess
 import importlib.util
+from importlib.metadata import distributions
 from pathlib import Path
 
 # 最低 Python 版本要求
@@ -48,17 +49,43 @@ def check_python_version():
     return True
 
 
-def check_package(import_name):
-    """检查包是否已安装"""
+def normalize_dist_name(name):
+    """规范化分发包名（忽略大小写和 -/_ 差异）"""
+    return name.lower().replace("_", "-")
+
+
+def list_installed_distributions():
+    """一次读取已安装分发包的元数据，返回规范化后的包名集合（不导入任何模块）"""
+    names = set()
+    for dist in distributions():
+        name = dist.metadata["Name"]
+        if name:
+            names.add(normalize_dist_name(name))
+    return frozenset(names)
+
+
+def check_package(import_name, pip_name=None, installed=None):
+    """检查包是否已安装
+
+    installed 为 list_installed_distributions() 的快照，按 pip 包名判断；
+    不在快照中时再用 find_spec 确认（如未通过 pip 安装的模块）。
+    """
+    if installed is not None and pip_name and normalize_dist_name(pip_name) in installed:
+        return True
     return importlib.util.find_spec(import_name) is not None
 
 
 def install_package(pip_name):
     """安装包"""
     print(f"  正在安装 {pip_name}...")
+    return install_packages([pip_name])
+
+
+def install_packages(pip_names):
+    """在同一个 pip 进程中安装多个包"""
     try:
         subprocess.check_call(
-            [sys.executable, "-m", "pip", "install", pip_name, "-q"],
+            [sys.executable, "-m", "pip", "install", *pip_names, "-q"],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
@@ -71,43 +98,44 @@ def check_and_install_dependencies():
     """检查并安装依赖"""
     print("\n检查依赖项...")
 
-    missing_required = []
+    # pip 包名 -> 导入名（按 pip 包名去重，pywin32 可能出现多次）
+    missing_required = {}
+    installed = list_installed_distributions()
 
     # 检查必需依赖
     for import_name, pip_name in REQUIRED_PACKAGES:
-        if check_package(import_name):
+        if check_package(import_name, pip_name, installed):
             print(f"  ✓ {pip_name}")
         else:
             print(f"  ✗ {pip_name} (缺失)")
-            missing_required.append((import_name, pip_name))
+            missing_required.setdefault(pip_name, import_name)
 
     # Windows 特定依赖（在 Windows 上也是必需的）
     if sys.platform == "win32":
         print("\n检查 Windows 依赖...")
         for import_name, pip_name in WINDOWS_PACKAGES:
-            if check_package(import_name):
+            if check_package(import_name, pip_name, installed):
                 print(f"  ✓ {pip_name}")
             else:
                 print(f"  ✗ {pip_name} (缺失)")
-                missing_required.append((import_name, pip_name))
+                missing_required.setdefault(pip_name, import_name)
 
     # 安装缺失的依赖
     if missing_required:
         print("\n安装缺失的依赖...")
-        # 去重（pywin32 可能出现多次）
-        seen = set()
-        unique_missing = []
-        for item in missing_required:
-            if item[1] not in seen:
-                seen.add(item[1])
-                unique_missing.append(item)
-
-        for import_name, pip_name in unique_missing:
-            if install_package(pip_name):
+        pip_names = list(missing_required)
+        print(f"  正在安装 {' '.join(pip_names)}...")
+        if install_packages(pip_names):
+            for pip_name in pip_names:
                 print(f"  ✓ {pip_name} 安装成功")
-            else:
-                print(f"  ✗ {pip_name} 安装失败")
-                return False
+        else:
+            # 批量安装失败时逐个安装，定位失败的包
+            for pip_name in pip_names:
+                if install_package(pip_name):
+                    print(f"  ✓ {pip_name} 安装成功")
+                else:
+                    print(f"  ✗ {pip_name} 安装失败")
+                    return False
 
     return True
 
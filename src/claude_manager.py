@@ -4,9 +4,13 @@ Claude Code 进程管理器
 """
 
 import asyncio
+import functools
 import logging
 import re
+import shutil
+import subprocess
 import sys
+import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime
@@ -15,6 +19,24 @@ from typing import Optional
 
 logger = logging.getLogger("bmad-gui")
 
+# ANSI 转义序列（颜色、光标控制、OSC 标题等）
+_ANSI_ESCAPE_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~]|\][^\x07]*\x07)')
+
+# 无状态模式下同时执行的 claude 子进程上限
+MAX_STATELESS_TASKS = 4
+
+# PTY 输出合并窗口（秒）及单次合并的最大块数，连续输出时合并为一次广播
+OUTPUT_COALESCE_WINDOW = 0.01
+OUTPUT_COALESCE_MAX_CHUNKS = 16
+
+# 处理 PTY 输出出错后的重试退避（秒）
+ERROR_BACKOFF_INITIAL = 0.05
+ERROR_BACKOFF_MAX = 1.0
+
+# 停止时等待无状态命令结束的时间，以及 terminate 后等待子进程退出的时间（秒）
+STATELESS_STOP_TIMEOUT = 5
+STATELESS_TERMINATE_TIMEOUT = 2
+
 # Windows PTY 支持
 try:
     import winpty
@@ -23,6 +45,30 @@ except ImportError:
     WINPTY_AVAILABLE = False
 
 
+# claude 可执行文件路径缓存（首次找到后不再扫描 PATH）
+_claude_path: Optional[str] = None
+
+
+def _find_claude() -> Optional[str]:
+    """查找 claude 命令路径，只扫描 PATH，不启动进程"""
+    global _claude_path
+    if _claude_path is None:
+        _claude_path = shutil.which("claude")
+    return _claude_path
+
+
+def _process_alive(proc) -> bool:
+    """子进程是否仍在运行（兼容 subprocess.Popen 与 asyncio Process）"""
+    if isinstance(proc, subprocess.Popen):
+        return proc.poll() is None
+    return proc.returncode is None
+
+
+def _now_ms() -> int:
+    """当前时间戳（毫秒，整数）"""
+    return time.time_ns() // 1_000_000
+
+
 class ProcessStatus(Enum):
     """Claude Code 进程状态枚举"""
     STOPPED = "stopped"
@@ -54,8 +100,12 @@ class ClaudeCodeManager:
         self.error_message: Optional[str] = None
         self._pty_process = None
         self._read_task: Optional[asyncio.Task] = None
-        self._output_buffer = ""
         self._broadcast_func = broadcast_func
+        self._stateless_sem = asyncio.Semaphore(MAX_STATELESS_TASKS)
+        self._inflight: set[asyncio.Task] = set()
+        # 无状态命令启动的 claude -p 子进程（subprocess.Popen 或 asyncio Process）
+        self._inflight_procs: set = set()
+        self._shutdown_event = asyncio.Event()
 
     async def _broadcast(self, event_type: str, data: dict):
         """广播事件"""
@@ -70,6 +120,7 @@ class ClaudeCodeManager:
 
         try:
             self.status = ProcessStatus.STARTING
+            self._shutdown_event.clear()
             logger.info(f"正在启动 Claude Code: project={self.project_path}")
             await self._broadcast("claude_status", {"status": "starting"})
 
@@ -82,16 +133,10 @@ class ClaudeCodeManager:
                 self._read_task = asyncio.create_task(self._read_pty_output())
             else:
                 logger.warning("未安装 winpty，将使用无状态模式（每个命令独立执行）")
-                check_proc = await asyncio.create_subprocess_shell(
-                    "claude --version",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, stderr = await check_proc.communicate()
-                if check_proc.returncode != 0:
+                claude_path = _find_claude()
+                if not claude_path:
                     raise FileNotFoundError("claude command not found")
-                version = stdout.decode('utf-8', errors='replace').strip()
-                logger.info(f"Claude Code CLI 版本: {version}")
+                logger.info(f"Claude Code CLI: {claude_path}")
                 self.pid = 1
 
             self.started_at = datetime.now()
@@ -125,6 +170,7 @@ class ClaudeCodeManager:
 
     async def stop(self) -> bool:
         """停止 Claude Code 进程"""
+        self._shutdown_event.set()
         if self._read_task and not self._read_task.done():
             self._read_task.cancel()
             try:
@@ -139,12 +185,43 @@ class ClaudeCodeManager:
                 logger.error(f"关闭 PTY 进程失败: {e}")
             self._pty_process = None
 
+        # 等待无状态模式下仍在执行的命令，超时则结束子进程并取消任务
+        if self._inflight:
+            _, pending = await asyncio.wait(self._inflight, timeout=STATELESS_STOP_TIMEOUT)
+            if pending:
+                await self._kill_stateless_processes()
+                for task in pending:
+                    task.cancel()
+
         self.status = ProcessStatus.STOPPED
         self.pid = None
         logger.info("Claude Code 已停止")
         await self._broadcast("claude_status", {"status": "stopped"})
         return True
 
+    async def _kill_stateless_processes(self):
+        """结束仍在运行的 claude -p 子进程：先 terminate，超时后 kill"""
+        procs = [p for p in self._inflight_procs if _process_alive(p)]
+        if not procs:
+            return
+        logger.info(f"结束 {len(procs)} 个仍在运行的无状态命令")
+        for proc in procs:
+            try:
+                proc.terminate()
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + STATELESS_TERMINATE_TIMEOUT
+        while time.monotonic() < deadline and any(_process_alive(p) for p in procs):
+            await asyncio.sleep(0.1)
+
+        for proc in procs:
+            if _process_alive(proc):
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+
     def get_status(self) -> dict:
         """获取进程状态"""
         return {
@@ -168,40 +245,100 @@ class ClaudeCodeManager:
                 self._pty_process.write(command + '\n')
                 return True
             else:
-                asyncio.create_task(self._execute_stateless(command))
+                task = asyncio.create_task(self._execute_stateless(command))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
                 return True
         except Exception as e:
             logger.error(f"命令发送失败: {e}")
             return False
 
+    def _pty_reader_thread(self, pty_process, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        """后台线程：阻塞读取 PTY，有数据时投递到事件循环
+
+        winpty 没有可注册到事件循环的 fd，这里用专用线程阻塞等待数据，
+        读到后通过 call_soon_threadsafe 唤醒协程，避免轮询和线程池往返。
+        读取结束（进程退出或被关闭）时投递 None。
+        """
+        try:
+            while pty_process.isalive():
+                data = pty_process.read(4096)
+                if data:
+                    loop.call_soon_threadsafe(queue.put_nowait, data)
+        except EOFError:
+            pass
+        except Exception as e:
+            logger.error(f"读取 PTY 输出错误: {e}")
+        finally:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
     async def _read_pty_output(self):
         """持续读取 PTY 输出并广播"""
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~]|\][^\x07]*\x07)')
-
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        reader = threading.Thread(
+            target=self._pty_reader_thread,
+            args=(self._pty_process, loop, queue),
+            name="claude-pty-reader",
+            daemon=True
+        )
+        reader.start()
+
+        backoff = ERROR_BACKOFF_INITIAL
         while self._pty_process and self.status == ProcessStatus.RUNNING:
             try:
-                output = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: self._pty_process.read(4096) if self._pty_process.isalive() else ""
-                )
+                output = await queue.get()
+                if output is None:
+                    break
+
+                # 等待一个短窗口，把期间到达的输出合并成一次广播
+                finished = False
+                if queue.empty():
+                    await asyncio.sleep(OUTPUT_COALESCE_WINDOW)
+                chunks = [output]
+                while not queue.empty() and len(chunks) < OUTPUT_COALESCE_MAX_CHUNKS:
+                    data = queue.get_nowait()
+                    if data is None:
+                        finished = True
+                        break
+                    chunks.append(data)
+                if len(chunks) > 1:
+                    output = "".join(chunks)
 
-                if output:
+                # f-string 会在日志级别判断前求值，这里先判断以免每块都复制一次 repr
+                if logger.isEnabledFor(logging.DEBUG):
                     logger.debug(f"PTY 原始输出 ({len(output)} bytes): {repr(output[:200])}")
-                    clean_output = ansi_escape.sub('', output)
-                    if clean_output:
-                        logger.info(f"广播输出: {clean_output[:100]}...")
-                        await self._broadcast("claude_output", {
-                            "event_type": "text",
-                            "content": clean_output,
-                            "timestamp": time.time() * 1000
-                        })
+                # 纯文本块不含 ESC，跳过正则替换
+                if '\x1b' in output:
+                    clean_output = _ANSI_ESCAPE_RE.sub('', output)
                 else:
-                    await asyncio.sleep(0.1)
+                    clean_output = output
+                if clean_output:
+                    logger.info(f"广播输出: {clean_output[:100]}...")
+                    await self._broadcast("claude_output", {
+                        "event_type": "text",
+                        "content": clean_output,
+                        "timestamp": _now_ms()
+                    })
+                if finished:
+                    break
+                backoff = ERROR_BACKOFF_INITIAL
 
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"读取 PTY 输出错误: {e}")
-                await asyncio.sleep(0.5)
+                logger.error(f"处理 PTY 输出错误: {e}")
+                # 指数退避，stop() 设置关闭事件后立即退出
+                try:
+                    await asyncio.wait_for(self._shutdown_event.wait(), timeout=backoff)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(backoff * 2, ERROR_BACKOFF_MAX)
 
         if self._pty_process and not self._pty_process.isalive():
             logger.info("Claude Code PTY 进程已退出")
@@ -210,23 +347,57 @@ class ClaudeCodeManager:
 
     async def _execute_stateless(self, command: str):
         """无状态模式：使用 claude -p 执行单个命令"""
+        async with self._stateless_sem:
+            await self._run_stateless(command)
+
+    async def _spawn_stateless(self, command: str):
+        """在线程池中启动 claude -p 子进程，再把管道接入事件循环
+
+        Unix 下 subprocess.Popen 会阻塞读取 exec 状态管道，直接在事件循环里
+        fork/exec 会造成卡顿，因此放到线程池执行。
+
+        Returns:
+            (popen, stdout_reader, stderr_reader, wait)，wait() 返回退出码
+        """
+        loop = asyncio.get_running_loop()
+        popen = await loop.run_in_executor(None, functools.partial(
+            subprocess.Popen,
+            [_find_claude() or "claude", "-p", command],
+            cwd=self.project_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0
+        ))
+
+        async def connect(pipe) -> asyncio.StreamReader:
+            reader = asyncio.StreamReader()
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+            return reader
+
+        stdout = await connect(popen.stdout)
+        stderr = await connect(popen.stderr)
+
+        async def wait() -> int:
+            return await loop.run_in_executor(None, popen.wait)
+
+        return popen, stdout, stderr, wait
+
+    async def _run_stateless(self, command: str):
+        """执行单个无状态命令并广播输出"""
+        process = None
         try:
-            escaped_command = command.replace('"', '\\"')
-
             if sys.platform == "win32":
-                process = await asyncio.create_subprocess_shell(
-                    f'claude -p "{escaped_command}"',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                    cwd=self.project_path
-                )
-            else:
+                # 参数列表由 subprocess 负责转义，不再经过 cmd.exe 拼接命令字符串
                 process = await asyncio.create_subprocess_exec(
-                    "claude", "-p", command,
+                    _find_claude() or "claude", "-p", command,
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE,
                     cwd=self.project_path
                 )
+                stdout, stderr, wait = process.stdout, process.stderr, process.wait
+            else:
+                process, stdout, stderr, wait = await self._spawn_stateless(command)
+            self._inflight_procs.add(process)
 
             async def read_stream(stream, event_type):
                 while True:
@@ -238,20 +409,20 @@ class ClaudeCodeManager:
                         await self._broadcast("claude_output", {
                             "event_type": event_type,
                             "content": content,
-                            "timestamp": time.time() * 1000
+                            "timestamp": _now_ms()
                         })
 
             await asyncio.gather(
-                read_stream(process.stdout, "text"),
-                read_stream(process.stderr, "error")
+                read_stream(stdout, "text"),
+                read_stream(stderr, "error")
             )
 
-            await process.wait()
+            exit_code = await wait()
             await self._broadcast("claude_output", {
                 "event_type": "complete",
                 "content": "",
-                "timestamp": time.time() * 1000,
-                "exit_code": process.returncode
+                "timestamp": _now_ms(),
+                "exit_code": exit_code
             })
 
         except Exception as e:
@@ -259,5 +430,7 @@ class ClaudeCodeManager:
             await self._broadcast("claude_output", {
                 "event_type": "error",
                 "content": f"执行失败: {str(e)}",
-                "timestamp": time.time() * 1000
+                "timestamp": _now_ms()
             })
+        finally:
+            self._inflight_procs.discard(process)
@@ -4,6 +4,7 @@ BMAD GUI - Configuration
 """
 
 from pathlib import Path
+from types import MappingProxyType
 
 # 服务器配置
 DEFAULT_PORT = 8765
@@ -20,7 +21,7 @@ RECENT_PROJECTS_FILE = DATA_DIR / "recent-projects.json"
 MAX_RECENT_PROJECTS = 10
 
 # 错误码定义
-ERROR_CODES = {
+ERROR_CODES = MappingProxyType({
     "NOT_BMAD_PROJECT": 400,
     "FILE_NOT_FOUND": 404,
     "PARSE_ERROR": 500,
@@ -28,14 +29,18 @@ ERROR_CODES = {
     "ALREADY_EXISTS": 400,
     "CREATE_FAILED": 500,
     "PERMISSION_DENIED": 403,
-}
+})
 
 # SSE 配置
 SSE_HEARTBEAT_INTERVAL = 30  # 心跳间隔（秒）
+SSE_HEARTBEAT_MAX_INTERVAL = 90  # 长时间没有事件时心跳间隔逐步放宽的上限（秒）
 SSE_RETRY_TIMEOUT = 3000  # 客户端重连间隔（毫秒）
+SSE_REPLAY_BUFFER_SIZE = 64  # 保留最近的事件数量，供客户端重连时按 Last-Event-ID 补发
+SSE_WRITE_TIMEOUT = 2.0  # 单次写入（含等待发送缓冲区排空）的最长时间（秒）
 
 # 监听的文件模式
-WATCHED_FILES = {
+WATCHED_FILES = MappingProxyType({
     "bmm-workflow-status.yaml": "workflow",
     "sprint-status.yaml": "sprint",
-}
+})
+WATCHED_FILENAMES = frozenset(WATCHED_FILES)
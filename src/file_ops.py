@@ -3,35 +3,322 @@ BMAD GUI - File Operations
 文件操作相关函数
 """
 
+import os
 import json
+import math
+import asyncio
+import uuid
 import shutil
+import hashlib
+import itertools
 import logging
+import functools
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
 import yaml
 
+# 优先使用 libyaml 的 C 实现（安全语义与 SafeLoader/SafeDumper 相同）
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
 from config import (
     RECENT_PROJECTS_FILE, MAX_RECENT_PROJECTS,
     DATA_DIR, BMAD_TEMPLATE_DIR, CLAUDE_TEMPLATE_DIR
 )
+from utils import json_dumps_bytes, json_loads
 
 logger = logging.getLogger("bmad-gui")
 
+# YAML 解析缓存: (文件路径, 读取的顶层键) -> (st_mtime_ns, st_size, 解析结果)
+_yaml_cache: dict[tuple[Path, tuple[str, ...] | None], tuple[int, int, object]] = {}
+# 缓存的文件数上限（切换过多个项目后整体清空）
+YAML_CACHE_MAX_FILES = 32
+# 已作废的缓存次数（每次 invalidate_yaml_cache 加一），与 mtime、大小一起用于 ETag，
+# 写入前后 mtime 和大小都不变时 ETag 也会变化
+_yaml_invalidations = itertools.count(1)
+_yaml_generation = 0
+# 正在线程中读取的 YAML: (文件路径, 读取的顶层键) -> 读取任务
+_yaml_inflight: dict[tuple[Path, tuple[str, ...] | None], asyncio.Task] = {}
+
+# YAML 解析结果的 JSON 副本目录名（位于 DATA_DIR 下，重启后免去重新解析 YAML）
+YAML_JSON_CACHE_DIRNAME = "yaml-cache"
+# 启动时清理超过该天数未更新的 JSON 副本（项目删除、移动或很久未打开）
+YAML_JSON_CACHE_MAX_AGE_DAYS = 30
+
+# 写入 YAML 时的行宽：足够大，长字符串不会被折行（保持原样，也省去折行计算）
+YAML_DUMP_WIDTH = 4096
+
+# 最近项目列表缓存: (文件路径, st_mtime_ns, st_size, 项目列表)
+_recent_projects_cache: tuple[Path, int, int, list] | None = None
+# 当前项目路径缓存: (文件路径, st_mtime_ns, st_size, 最近项目列表第一项的路径)
+_active_project_cache: tuple[Path, int, int, Path | None] | None = None
+
+
+@dataclass(frozen=True)
+class ProjectPaths:
+    """项目内常用路径"""
+    root: Path
+    bmad_dir: Path
+    bmm_dir: Path
+    agents_dir: Path
+    bmm_config: Path
+    cfg_config: Path
+    bmad_config: Path
+
+
+@functools.lru_cache(maxsize=32)
+def get_project_paths(project_path: str) -> ProjectPaths:
+    """获取项目常用路径，按项目路径缓存，避免每次请求重复拼接"""
+    root = Path(project_path)
+    bmad_dir = root / ".bmad"
+    bmm_dir = bmad_dir / "bmm"
+    return ProjectPaths(
+        root=root,
+        bmad_dir=bmad_dir,
+        bmm_dir=bmm_dir,
+        agents_dir=bmm_dir / "agents",
+        bmm_config=bmm_dir / "config.yaml",
+        cfg_config=bmad_dir / "_cfg" / "config.yaml",
+        bmad_config=bmad_dir / "config.yaml",
+    )
+
+
+def load_yaml_file(path: Path):
+    """一次性读取文件字节并在内存中解析 YAML（libyaml 自动识别 UTF-8）"""
+    return yaml.load(path.read_bytes(), Loader=YamlLoader)
+
+
+def load_yaml_keys(path: Path, keys):
+    """读取 YAML 文件，顶层为映射时只构造 keys 中列出的顶层键
+
+    整个文件仍由 libyaml 解析为节点树，但只把这些键对应的子树构造为 Python 对象，
+    其余顶层键的内容不会构建成字典和列表；文件中没有的键不出现在结果中。
+    顶层不是映射（包括空文件）时按完整解析的结果返回。
+    """
+    loader = YamlLoader(path.read_bytes())
+    try:
+        root = loader.get_single_node()
+        if root is None:
+            return None
+        if not isinstance(root, yaml.MappingNode):
+            return loader.construct_document(root)
+        value_nodes = {}
+        # 与完整解析一致，重复的键以最后一次出现为准
+        for key_node, node in root.value:
+            if isinstance(key_node, yaml.ScalarNode) and key_node.value in keys:
+                value_nodes[key_node.value] = node
+        return {key: loader.construct_document(node) for key, node in value_nodes.items()}
+    finally:
+        loader.dispose()
+
+
+def _is_plain_json(obj) -> bool:
+    """检查数据能否无损转换为 JSON（键都是字符串，值只有字符串、数字、布尔和 null）"""
+    if obj is None or isinstance(obj, (str, bool)):
+        return True
+    if isinstance(obj, int):
+        return -2**63 <= obj < 2**64
+    if isinstance(obj, float):
+        return math.isfinite(obj)
+    if isinstance(obj, list):
+        return all(_is_plain_json(item) for item in obj)
+    if isinstance(obj, dict):
+        return all(type(key) is str and _is_plain_json(value) for key, value in obj.items())
+    return False
+
+
+def _json_cache_file(path: Path, keys: tuple[str, ...] | None) -> Path:
+    """YAML 文件对应的 JSON 副本路径（按 YAML 文件路径和读取的键的哈希命名）"""
+    name = str(path) if keys is None else "\0".join((str(path), *keys))
+    digest = hashlib.sha1(name.encode('utf-8', 'surrogatepass')).hexdigest()
+    return DATA_DIR / YAML_JSON_CACHE_DIRNAME / f"{digest}.json"
+
+
+def _read_json_cache(path: Path, keys: tuple[str, ...] | None, st):
+    """读取 YAML 文件的 JSON 副本，副本不存在或与文件当前的 mtime、大小不符时返回 None
+
+    Returns:
+        (解析结果,) 或 None（YAML 内容为空时解析结果本身就是 None）
+    """
+    try:
+        entry = json_loads(_json_cache_file(path, keys).read_bytes())
+    except (OSError, ValueError):
+        return None
+    if (isinstance(entry, dict) and entry.get('path') == str(path)
+            and entry.get('keys') == (list(keys) if keys is not None else None)
+            and entry.get('mtime_ns') == st.st_mtime_ns and entry.get('size') == st.st_size):
+        return (entry.get('data'),)
+    return None
+
+
+def _write_json_cache(path: Path, keys: tuple[str, ...] | None, st, data) -> None:
+    """把 YAML 解析结果写成 JSON 副本；含日期等 JSON 无法表示的数据时不写"""
+    try:
+        if not _is_plain_json(data):
+            return
+        cache_file = _json_cache_file(path, keys)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，并发读取时不会读到写了一半的副本
+        tmp_file = cache_file.with_name(f"{cache_file.stem}.{uuid.uuid4().hex}.tmp")
+        tmp_file.write_bytes(json_dumps_bytes({
+            'path': str(path),
+            'keys': list(keys) if keys is not None else None,
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'data': data,
+        }))
+        tmp_file.replace(cache_file)
+    except Exception as e:
+        logger.debug(f"写入 YAML 的 JSON 副本失败: {path}: {e}")
+
+
+def prune_yaml_json_cache() -> int:
+    """清理过期的 JSON 副本（服务器启动时调用）
+
+    删除源 YAML 文件已不存在、超过 YAML_JSON_CACHE_MAX_AGE_DAYS 天未更新或无法读取的副本，
+    以及写入中断留下的临时文件。仍在使用的副本被删除后，下次读取时会重新生成。
+
+    Returns:
+        删除的文件数
+    """
+    cache_dir = DATA_DIR / YAML_JSON_CACHE_DIRNAME
+    cutoff = datetime.now().timestamp() - YAML_JSON_CACHE_MAX_AGE_DAYS * 86400
+    removed = 0
+    try:
+        entries = list(os.scandir(cache_dir))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.name.endswith('.tmp'):
+                stale = True
+            elif entry.name.endswith('.json'):
+                stale = entry.stat().st_mtime < cutoff
+                if not stale:
+                    try:
+                        source = json_loads(Path(entry.path).read_bytes()).get('path')
+                        stale = not isinstance(source, str) or not os.path.exists(source)
+                    except (ValueError, AttributeError):
+                        stale = True
+            else:
+                continue
+            if stale:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.info(f"清理了 {removed} 个过期的 YAML JSON 副本")
+    return removed
+
+
+def load_yaml_cached(path: Path, keys: tuple[str, ...] | None = None):
+    """读取 YAML 文件，mtime 和大小都未变化时直接复用上次的解析结果
+
+    指定 keys 时只构造这些顶层键（见 load_yaml_keys），按 (路径, keys) 分别缓存。
+    内存中没有缓存时（如服务器重启后）优先读取 DATA_DIR 下的 JSON 副本，
+    解析 JSON 比解析 YAML 快得多；副本过期或不存在时才解析 YAML 并重新生成副本。
+    返回的对象在各调用方之间共享，调用方不能原地修改。
+    """
+    st = path.stat()
+    cache_key = (path, keys)
+    cached = _yaml_cache.get(cache_key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    from_json = _read_json_cache(path, keys, st)
+    if from_json is not None:
+        data = from_json[0]
+    else:
+        data = load_yaml_file(path) if keys is None else load_yaml_keys(path, keys)
+        _write_json_cache(path, keys, st, data)
+    if cache_key not in _yaml_cache and len(_yaml_cache) >= YAML_CACHE_MAX_FILES:
+        _yaml_cache.clear()
+    _yaml_cache[cache_key] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+
+async def load_yaml_cached_async(path: Path, keys: tuple[str, ...] | None = None):
+    """在线程中执行 load_yaml_cached，同一文件的并发请求共用同一次读取
+
+    文件变化后同时到达的多个轮询请求只解析一次，其余请求等待同一个任务。
+    字典只在事件循环线程中修改，不需要额外加锁。
+    """
+    cache_key = (path, keys)
+    task = _yaml_inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(load_yaml_cached, path, keys))
+        _yaml_inflight[cache_key] = task
+
+        def _done(finished: asyncio.Task) -> None:
+            if _yaml_inflight.get(cache_key) is finished:
+                del _yaml_inflight[cache_key]
+
+        task.add_done_callback(_done)
+    # 单个请求被取消时不影响其他等待同一任务的请求
+    return await asyncio.shield(task)
+
+
+def invalidate_yaml_cache(path: Path) -> None:
+    """丢弃文件的解析缓存和 JSON 副本（写入文件后调用）
+
+    mtime 精度较粗的文件系统上，写入前后 mtime 和大小可能都不变，仅靠比较无法发现变化。
+    """
+    global _yaml_generation
+    _yaml_generation = next(_yaml_invalidations)
+    # 其他线程中的 load_yaml_cached 可能同时写入缓存，遍历前先取快照
+    # （list(dict) 在持有 GIL 时一次完成，不会遇到迭代中字典大小变化）
+    key_sets = {keys for cached_path, keys in list(_yaml_cache) if cached_path == path}
+    key_sets.add(None)
+    for keys in key_sets:
+        _yaml_cache.pop((path, keys), None)
+        try:
+            _json_cache_file(path, keys).unlink()
+        except OSError:
+            pass
+
+
+def yaml_cache_generation() -> int:
+    """当前的缓存作废次数（见 invalidate_yaml_cache），用作 ETag 的一部分"""
+    return _yaml_generation
+
+
+def save_yaml_file(path: Path, data) -> None:
+    """以原子方式写入 YAML 文件，并作废该文件的解析缓存
+
+    先写入同目录下的临时文件再替换目标文件，写入中途失败或被中断时原文件保持完整，
+    读取方（包括文件监听）也不会读到写了一半的内容。替换前先 fsync 临时文件，
+    系统崩溃或断电后也不会留下内容为空的状态文件。
+    """
+    tmp_file = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            yaml.dump(data, f, Dumper=YamlDumper, allow_unicode=True, default_flow_style=False,
+                      sort_keys=False, width=YAML_DUMP_WIDTH)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_file.replace(path)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+    finally:
+        invalidate_yaml_cache(path)
+
 
 def is_bmad_project(path: Path) -> bool:
     """检查目录是否为 BMAD 项目"""
-    bmad_dir = path / ".bmad"
-    config_file = bmad_dir / "bmm" / "config.yaml"
-    return bmad_dir.exists() and config_file.exists()
+    paths = get_project_paths(str(path))
+    return paths.bmad_dir.exists() and paths.bmm_config.exists()
 
 
 def parse_bmad_config(path: Path) -> dict | None:
     """解析 BMAD 配置文件，失败返回 None"""
-    config_file = path / ".bmad" / "bmm" / "config.yaml"
+    config_file = get_project_paths(str(path)).bmm_config
     try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        config = load_yaml_file(config_file)
         return {
             'user_name': config.get('user_name', 'Unknown'),
             'communication_language': config.get('communication_language', 'english'),
@@ -44,24 +331,70 @@ def parse_bmad_config(path: Path) -> dict | None:
 
 
 async def load_recent_projects() -> list:
-    """加载最近项目列表"""
-    if not RECENT_PROJECTS_FILE.exists():
+    """加载最近项目列表
+
+    按文件 mtime 和大小缓存解析结果，文件未变化时不再重复读取和解码。
+    """
+    global _recent_projects_cache
+    try:
+        st = RECENT_PROJECTS_FILE.stat()
+    except FileNotFoundError:
+        _recent_projects_cache = None
+        return []
+    except Exception as e:
+        logger.error(f"加载最近项目失败: {e}")
         return []
+
+    cache = _recent_projects_cache
+    if (cache and cache[0] == RECENT_PROJECTS_FILE
+            and cache[1] == st.st_mtime_ns and cache[2] == st.st_size):
+        return list(cache[3])
+
     try:
         with open(RECENT_PROJECTS_FILE, 'r', encoding='utf-8') as f:
             data = json.load(f)
         if isinstance(data, list):
-            return data
+            projects = data
         elif isinstance(data, dict) and 'projects' in data:
-            return data['projects']
-        return []
+            projects = data['projects']
+        else:
+            projects = []
     except Exception as e:
         logger.error(f"加载最近项目失败: {e}")
         return []
 
+    _recent_projects_cache = (RECENT_PROJECTS_FILE, st.st_mtime_ns, st.st_size, projects)
+    return list(projects)
+
+
+async def get_active_project_path() -> Path | None:
+    """获取当前项目（最近项目列表第一项）的路径，没有项目时返回 None
+
+    最近项目文件未变化时只需一次 stat，不再复制列表和构造 Path。
+    """
+    global _active_project_cache
+    try:
+        st = RECENT_PROJECTS_FILE.stat()
+    except OSError:
+        return None
+
+    cache = _active_project_cache
+    if (cache and cache[0] == RECENT_PROJECTS_FILE
+            and cache[1] == st.st_mtime_ns and cache[2] == st.st_size):
+        return cache[3]
+
+    projects = await load_recent_projects()
+    path = Path(projects[0].get("path", "")) if projects else None
+    _active_project_cache = (RECENT_PROJECTS_FILE, st.st_mtime_ns, st.st_size, path)
+    return path
+
 
 async def save_recent_projects(projects: list) -> None:
     """保存最近项目列表"""
+    global _recent_projects_cache, _active_project_cache
+    # mtime 精度较粗的文件系统上写入前后可能相同，直接作废缓存
+    _recent_projects_cache = None
+    _active_project_cache = None
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     try:
         with open(RECENT_PROJECTS_FILE, 'w', encoding='utf-8') as f:
@@ -1,26 +1,35 @@
 """
 BMAD GUI - API Handlers
 API 处理器模块
+
+子模块按需导入（PEP 562），导入 handlers.xxx 时不会连带加载其他处理器
+（例如 claude 处理器依赖的 pyautogui 导入较慢）。
 """
 
-from .response import json_response, error_response, success_response
-from .project import (
-    open_project_handler,
-    create_project_handler,
-    recent_projects_handler,
-    delete_recent_project_handler,
-)
-from .agents import get_agents_handler, get_agent_detail_handler
-from .command import execute_command_handler
-from .claude import (
-    start_claude_handler,
-    stop_claude_handler,
-    get_claude_status_handler,
-    launch_claude_window_handler,
-    send_command_handler,
-)
-from .workflow import workflow_status_handler, sprint_status_handler
-from .sse import sse_handler, broadcast_sse_event
+import importlib
+
+# 导出名 -> 所在子模块
+_LAZY = {
+    'json_response': 'response',
+    'error_response': 'response',
+    'success_response': 'response',
+    'open_project_handler': 'project',
+    'create_project_handler': 'project',
+    'recent_projects_handler': 'project',
+    'delete_recent_project_handler': 'project',
+    'get_agents_handler': 'agents',
+    'get_agent_detail_handler': 'agents',
+    'execute_command_handler': 'command',
+    'start_claude_handler': 'claude',
+    'stop_claude_handler': 'claude',
+    'get_claude_status_handler': 'claude',
+    'launch_claude_window_handler': 'claude',
+    'send_command_handler': 'claude',
+    'workflow_status_handler': 'workflow',
+    'sprint_status_handler': 'workflow',
+    'sse_handler': 'sse',
+    'broadcast_sse_event': 'sse',
+}
 
 __all__ = [
     'json_response', 'error_response', 'success_response',
@@ -34,3 +43,16 @@ __all__ = [
     'workflow_status_handler', 'sprint_status_handler',
     'sse_handler', 'broadcast_sse_event',
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,6 +3,8 @@ BMAD GUI - Agent Handlers
 Agent API 处理器
 """
 
+import asyncio
+import os
 import re
 import logging
 from pathlib import Path
@@ -10,11 +12,63 @@ from pathlib import Path
 import yaml
 from aiohttp import web
 
-from file_ops import load_recent_projects
+from file_ops import load_recent_projects, get_project_paths, YamlLoader
 from .response import error_response, success_response
 
 logger = logging.getLogger("bmad-gui")
 
+# <agent name="..." title="..." icon="..."> 标签
+_AGENT_TAG_RE = re.compile(
+    r'<agent[^>]*\s+name="([^"]*)"[^>]*\s+title="([^"]*)"[^>]*\s+icon="([^"]*)"'
+)
+# <menu> 中的 <item cmd="...">...</item>
+_MENU_ITEM_RE = re.compile(r'<item\s+cmd="([^"]+)"[^>]*>([^<]+)</item>', re.DOTALL)
+# 正文中的 **workflow-name** ... workflow 引用
+_WORKFLOW_REF_RE = re.compile(r'\*\*?(\w[\w-]*)\*\*?.*?(?:workflow|工作流)', re.IGNORECASE)
+
+# front matter 中的顶层 "key: value" 行
+_FRONT_MATTER_LINE_RE = re.compile(r'^([A-Za-z_][\w-]*)\s*:(?:\s+(.*?))?\s*$')
+# 需要交给 YAML 解析器处理的标量（数字、布尔、null）
+_YAML_NON_STR_RE = re.compile(
+    r'^(?:[-+.]?\d.*|~|null|Null|NULL|true|True|TRUE|false|False|FALSE|'
+    r'yes|Yes|YES|no|No|NO|on|On|ON|off|Off|OFF)$'
+)
+_FRONT_MATTER_KEYS = ('title', 'icon', 'description')
+
+# Agent 解析结果缓存: 文件路径 -> (st_mtime_ns, 解析结果)
+_AGENT_CACHE: dict[str, tuple[int, dict | None]] = {}
+
+
+def _scan_front_matter(text: str) -> dict | None:
+    """快速提取 front matter 中的 title / icon / description
+
+    只处理单行 "key: value" 形式的简单标量；遇到嵌套、多行、锚点、
+    转义等无法确定的写法时返回 None，由调用方回退到 YAML 解析。
+    """
+    result = {}
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        match = _FRONT_MATTER_LINE_RE.match(line)
+        if not match:
+            return None
+        key, value = match.group(1), match.group(2)
+        if not value:
+            return None
+        if key not in _FRONT_MATTER_KEYS:
+            continue
+
+        quote = value[0]
+        if quote in ('"', "'"):
+            inner = value[1:-1]
+            if len(value) < 2 or value[-1] != quote or quote in inner or '\\' in inner:
+                return None
+            value = inner
+        elif value[0] in '&*!|>{[%@`,?-' or ' #' in value or ': ' in value or value.endswith(':') or _YAML_NON_STR_RE.match(value):
+            return None
+        result[key] = value
+    return result
+
 
 def parse_agent_file(file_path: Path) -> dict | None:
     """解析 Agent markdown 文件，提取元数据和命令"""
@@ -34,7 +88,9 @@ def parse_agent_file(file_path: Path) -> dict | None:
             parts = content.split('---', 2)
             if len(parts) >= 3:
                 try:
-                    front_matter = yaml.safe_load(parts[1])
+                    front_matter = _scan_front_matter(parts[1])
+                    if front_matter is None:
+                        front_matter = yaml.load(parts[1], Loader=YamlLoader)
                     if front_matter:
                         agent_data['title'] = front_matter.get('title', agent_data['title'])
                         agent_data['icon'] = front_matter.get('icon', agent_data['icon'])
@@ -43,19 +99,13 @@ def parse_agent_file(file_path: Path) -> dict | None:
                     pass
 
         # 解析 <agent> 标签
-        agent_tag_match = re.search(
-            r'<agent[^>]*\s+name="([^"]*)"[^>]*\s+title="([^"]*)"[^>]*\s+icon="([^"]*)"',
-            content
-        )
+        agent_tag_match = _AGENT_TAG_RE.search(content)
         if agent_tag_match:
             agent_data['title'] = agent_tag_match.group(2) or agent_data['title']
             agent_data['icon'] = agent_tag_match.group(3) or agent_data['icon']
 
         # 解析 <menu> 标签中的命令
-        menu_items = re.findall(
-            r'<item\s+cmd="([^"]+)"[^>]*>([^<]+)</item>',
-            content, re.DOTALL
-        )
+        menu_items = _MENU_ITEM_RE.findall(content)
 
         for cmd, label in menu_items:
             cmd = cmd.strip()
@@ -72,7 +122,7 @@ def parse_agent_file(file_path: Path) -> dict | None:
 
         # 如果没有 menu-item，尝试解析 workflow 引用
         if not agent_data['commands']:
-            workflow_matches = re.findall(r'\*\*?(\w[\w-]*)\*\*?.*?(?:workflow|工作流)', content, re.IGNORECASE)
+            workflow_matches = _WORKFLOW_REF_RE.findall(content)
             for wf in workflow_matches[:10]:
                 agent_data['commands'].append({
                     'name': wf,
@@ -94,24 +144,53 @@ async def get_agents_handler(request: web.Request) -> web.Response:
     if not projects:
         return error_response("FILE_NOT_FOUND", "没有打开的项目")
 
-    project_path = Path(projects[0].get("path", ""))
-    if not project_path.exists():
+    paths = get_project_paths(projects[0].get("path", ""))
+    if not paths.root.exists():
         return error_response("FILE_NOT_FOUND", "项目路径不存在")
 
-    agents_dir = project_path / ".bmad" / "bmm" / "agents"
+    agents_dir = paths.agents_dir
     if not agents_dir.exists():
         return error_response("FILE_NOT_FOUND", "Agents 目录不存在")
 
+    # 先按 mtime 命中缓存，只有变化的文件才在线程池中并发读取解析
+    results: dict[str, dict | None] = {}
+    stale: dict[str, int] = {}
+    with os.scandir(agents_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.name.endswith('.md') or not entry.is_file():
+                continue
+            # 与 is_file() 一致跟随符号链接，按实际读取的目标文件的 mtime 判断
+            mtime_ns = entry.stat().st_mtime_ns
+            cached = _AGENT_CACHE.get(entry.path)
+            if cached and cached[0] == mtime_ns:
+                results[entry.path] = cached[1]
+            else:
+                results[entry.path] = None
+                stale[entry.path] = mtime_ns
+
+    if stale:
+        parsed = await asyncio.gather(*(
+            asyncio.to_thread(parse_agent_file, Path(path)) for path in stale
+        ))
+        for (path, mtime_ns), agent_data in zip(stale.items(), parsed):
+            _AGENT_CACHE[path] = (mtime_ns, agent_data)
+            results[path] = agent_data
+
     agents = []
-    for agent_file in agents_dir.glob("*.md"):
-        agent_data = parse_agent_file(agent_file)
-        if agent_data:
-            agents.append({
-                'name': agent_data['name'],
-                'title': agent_data['title'],
-                'icon': agent_data['icon'],
-                'description': agent_data['description']
-            })
+    for agent_data in results.values():
+        if not agent_data:
+            continue
+        agents.append({
+            'name': agent_data['name'],
+            'title': agent_data['title'],
+            'icon': agent_data['icon'],
+            'description': agent_data['description']
+        })
+
+    # 清理该目录下已删除文件的缓存
+    dir_prefix = os.path.join(str(agents_dir), '')
+    for path in [p for p in _AGENT_CACHE if p.startswith(dir_prefix) and p not in results]:
+        del _AGENT_CACHE[path]
 
     logger.info(f"加载了 {len(agents)} 个 Agents")
     return success_response(agents)
@@ -127,13 +206,12 @@ async def get_agent_detail_handler(request: web.Request) -> web.Response:
     if not projects:
         return error_response("FILE_NOT_FOUND", "没有打开的项目")
 
-    project_path = Path(projects[0].get("path", ""))
-    agent_file = project_path / ".bmad" / "bmm" / "agents" / f"{agent_name}.md"
+    agent_file = get_project_paths(projects[0].get("path", "")).agents_dir / f"{agent_name}.md"
 
     if not agent_file.exists():
         return error_response("FILE_NOT_FOUND", f"Agent '{agent_name}' 不存在")
 
-    agent_data = parse_agent_file(agent_file)
+    agent_data = await asyncio.to_thread(parse_agent_file, agent_file)
     if not agent_data:
         return error_response("PARSE_ERROR", "Agent 文件解析失败")
 
@@ -4,10 +4,12 @@ Claude Code API 处理器
 """
 
 import asyncio
+import functools
 import json
 import logging
 import re
 import sys
+import time
 from pathlib import Path
 
 from aiohttp import web
@@ -15,6 +17,9 @@ from aiohttp import web
 from file_ops import load_recent_projects
 from claude_manager import ClaudeCodeManager, ProcessStatus
 from keyboard_sender import keyboard_sender
+from powershell_host import powershell_host
+from utils import json_dumps_bytes, json_loads
+from win32_procscan import list_processes, list_windows
 from .response import error_response, success_response
 from .sse import broadcast_sse_event
 
@@ -23,8 +28,151 @@ logger = logging.getLogger("bmad-gui")
 # 全局 ClaudeCodeManager 实例
 claude_manager = None
 
+# 进程检测结果缓存（秒）：连续检测结果不变时 TTL 逐步翻倍，直到上限
+DETECT_CACHE_TTL = 1.5
+DETECT_CACHE_TTL_MAX = 8.0
+
+# 项目路径 -> (过期时间, 当前 TTL, 检测结果)
+_detect_cache: dict[str | None, tuple[float, float, dict]] = {}
+# 项目路径 -> 锁，同一项目的并发检测只执行一次
+_detect_locks: dict[str | None, asyncio.Lock] = {}
+
+
+# 每个对象单独输出一行 JSON（NDJSON），边读边解析
+_NDJSON_SUFFIX = " | ForEach-Object { $_ | ConvertTo-Json -Compress -Depth 3 }"
+
+
+async def _ps_query(pipeline: str) -> tuple[list, str]:
+    """通过常驻 PowerShell 执行查询管道，逐行解析输出的对象
+
+    Returns:
+        (对象列表, 无法解析为 JSON 的输出行)
+    """
+    objects: list = []
+    unparsed: list[str] = []
+
+    def parse_line(line: str) -> None:
+        if not line.strip():
+            return
+        try:
+            objects.append(json_loads(line))
+        except json.JSONDecodeError:
+            unparsed.append(line)
+
+    await powershell_host.run_lines(pipeline + _NDJSON_SUFFIX, parse_line)
+    return objects, "\n".join(unparsed)
+
+
+# Claude 进程特征（与原 PowerShell -match 一样不区分大小写）
+# 方法1: node.exe 且命令行包含 "claude-code" 或 "@anthropic-ai"（Claude Code 的特征）
+# 方法2: 终端窗口（cmd/powershell/terminal），cmd 窗口标题通常显示当前目录
+# 方法2.5: 从 GUI 启动的 cmd.exe（命令行包含 "cd /d" 和 "claude"）
+# 方法3: 备用 - 窗口标题包含 claude 的进程
+_CLAUDE_CMDLINE_RE = re.compile(r'claude-code|@anthropic-ai', re.IGNORECASE)
+_CLAUDE_LAUNCH_CMDLINE_RE = re.compile(r'cd /d.*claude', re.IGNORECASE)
+_TERMINAL_PROCESS_NAMES = frozenset({'cmd', 'powershell', 'windowsterminal', 'pwsh'})
+# 路径模糊匹配时去掉的字符（只保留字母数字和路径分隔符，规避中文乱码）
+_PATH_NOISE_RE = re.compile(r'[^a-zA-Z0-9\\:/]')
+
+
+@functools.lru_cache(maxsize=8)
+def _project_match_keys(project_path: str) -> tuple[str, str, str]:
+    """计算项目路径的匹配用字符串，按路径缓存（状态接口会被频繁轮询）
+
+    Returns:
+        (小写项目名, 小写反斜杠路径, 只保留字母数字的路径（模糊匹配，处理编码问题）)
+    """
+    project_name = Path(project_path).name.lower()
+    project_path_lower = project_path.lower().replace('/', '\\')
+    return project_name, project_path_lower, _PATH_NOISE_RE.sub('', project_path_lower)
+
+
+async def _query_command_lines(pids: list[int]) -> dict[int, str]:
+    """查询指定进程的命令行（Win32 API 无法直接读取，仍需一次 PowerShell 调用）"""
+    if not pids:
+        return {}
+    pid_filter = " OR ".join(f"ProcessId={pid}" for pid in pids)
+    script = (
+        f'Get-CimInstance Win32_Process -Filter "{pid_filter}" -ErrorAction SilentlyContinue'
+        ' | Select-Object ProcessId,CommandLine'
+    )
+    data, _ = await _ps_query(script)
+    return {p.get('ProcessId'): p.get('CommandLine') or '' for p in data}
+
+
+async def _collect_claude_processes(include_terminals: bool) -> dict:
+    """收集 Claude 相关进程和窗口
+
+    进程列表和窗口标题通过 ctypes 直接调用 Win32 API 获取；
+    只有存在 node.exe / cmd.exe 时才调用 PowerShell 读取它们的命令行。
+
+    Returns:
+        {"claude": [...], "related": [...], "terminals": [...], "windows": [...]}
+        字段名与 Get-Process / Win32_Process 的输出保持一致
+    """
+    processes, windows = await asyncio.gather(
+        asyncio.to_thread(list_processes),
+        asyncio.to_thread(list_windows)
+    )
+    names = {pid: name for pid, name in processes}
+
+    candidates = {pid: name.lower() for pid, name in processes if name.lower() in ('node.exe', 'cmd.exe')}
+    cmdlines = await _query_command_lines(list(candidates))
+
+    claude, related = [], []
+    for pid, name_lower in candidates.items():
+        cmdline = cmdlines.get(pid, '')
+        if name_lower == 'node.exe':
+            if _CLAUDE_CMDLINE_RE.search(cmdline):
+                claude.append({'ProcessId': pid, 'Name': names[pid], 'CmdLine': cmdline[:300]})
+        elif _CLAUDE_LAUNCH_CMDLINE_RE.search(cmdline):
+            related.append({'ProcessId': pid, 'Name': names[pid], 'CmdLine': cmdline[:500]})
+
+    terminals, claude_windows = [], []
+    for _hwnd, pid, title in windows:
+        if include_terminals:
+            process_name = names.get(pid, '').rsplit('.', 1)[0]
+            if process_name.lower() in _TERMINAL_PROCESS_NAMES:
+                terminals.append({'Id': pid, 'ProcessName': process_name, 'MainWindowTitle': title})
+        if 'claude' in title.lower():
+            claude_windows.append({'Id': pid, 'MainWindowTitle': title})
+
+    return {"claude": claude, "related": related, "terminals": terminals, "windows": claude_windows}
+
+
+def invalidate_claude_process_cache() -> None:
+    """清空进程检测缓存（启动/停止 Claude 后调用）"""
+    _detect_cache.clear()
+
 
 async def detect_project_claude_process(project_path: str = None) -> dict:
+    """
+    检测指定项目目录中是否有 Claude Code 进程在运行（带缓存）
+
+    结果在 TTL 内直接复用；并发请求合并为一次检测。
+    返回值格式见 _scan_project_claude_process。
+    """
+    cached = _detect_cache.get(project_path)
+    if cached and time.monotonic() < cached[0]:
+        return dict(cached[2])
+
+    lock = _detect_locks.setdefault(project_path, asyncio.Lock())
+    async with lock:
+        # 等待锁期间其他请求可能已完成检测
+        cached = _detect_cache.get(project_path)
+        if cached and time.monotonic() < cached[0]:
+            return dict(cached[2])
+
+        result = await _scan_project_claude_process(project_path)
+
+        ttl = DETECT_CACHE_TTL
+        if cached and cached[2]["running"] == result["running"] and cached[2]["pid"] == result["pid"]:
+            ttl = min(cached[1] * 2, DETECT_CACHE_TTL_MAX)
+        _detect_cache[project_path] = (time.monotonic() + ttl, ttl, result)
+        return dict(result)
+
+
+async def _scan_project_claude_process(project_path: str = None) -> dict:
     """
     检测指定项目目录中是否有 Claude Code 进程在运行
 
@@ -39,69 +187,10 @@ async def detect_project_claude_process(project_path: str = None) -> dict:
 
     try:
         if sys.platform == "win32":
-            # 方法1: 通过命令行参数检测 Claude 进程
-            # 只检测 node.exe 进程，且命令行包含 "claude-code" 或 "@anthropic-ai"（Claude Code 的特征）
-            ps_cmd_cmdline = '''powershell -Command "Get-CimInstance Win32_Process -ErrorAction SilentlyContinue | Where-Object { $_.Name -eq 'node.exe' -and $_.CommandLine -match 'claude-code|@anthropic-ai' } | Select-Object ProcessId,Name,@{N='CmdLine';E={if($_.CommandLine.Length -gt 300){$_.CommandLine.Substring(0,300)}else{$_.CommandLine}}} | ConvertTo-Json -Compress"'''
-
-            proc = await asyncio.create_subprocess_shell(
-                ps_cmd_cmdline,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await proc.communicate()
-            output = stdout.decode('utf-8', errors='replace').strip()
-
-            claude_processes = []
-            if output:
-                try:
-                    data = json.loads(output)
-                    if isinstance(data, dict):
-                        data = [data]
-                    claude_processes = data
-                except json.JSONDecodeError:
-                    pass
-
-            # 方法2: 获取所有终端窗口（cmd/powershell/terminal），检查标题是否包含项目路径
-            # 因为 cmd 窗口标题通常显示当前目录
-            terminal_windows = []
-            if project_path:
-                ps_cmd_terminal = '''powershell -Command "Get-Process -ErrorAction SilentlyContinue | Where-Object { $_.MainWindowTitle -ne '' -and ($_.ProcessName -eq 'cmd' -or $_.ProcessName -eq 'powershell' -or $_.ProcessName -eq 'WindowsTerminal' -or $_.ProcessName -eq 'pwsh') } | Select-Object Id,ProcessName,MainWindowTitle | ConvertTo-Json -Compress"'''
-
-                proc = await asyncio.create_subprocess_shell(
-                    ps_cmd_terminal,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, _ = await proc.communicate()
-                output = stdout.decode('utf-8', errors='replace').strip()
-
-                if output:
-                    try:
-                        data = json.loads(output)
-                        if isinstance(data, dict):
-                            data = [data]
-                        terminal_windows = data
-                    except json.JSONDecodeError:
-                        pass
-
-            # 方法2.5: 获取从 GUI 启动的 cmd.exe 进程（命令行包含 "cd /d" 和 "claude"）
-            claude_related_processes = []
-            ps_cmd_related = '''powershell -Command "Get-CimInstance Win32_Process -ErrorAction SilentlyContinue | Where-Object { $_.Name -eq 'cmd.exe' -and $_.CommandLine -match 'cd /d.*claude' } | Select-Object ProcessId,Name,@{N='CmdLine';E={if($_.CommandLine.Length -gt 500){$_.CommandLine.Substring(0,500)}else{$_.CommandLine}}} | ConvertTo-Json -Compress"'''
-            proc = await asyncio.create_subprocess_shell(
-                ps_cmd_related,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await proc.communicate()
-            output = stdout.decode('utf-8', errors='replace').strip()
-            if output:
-                try:
-                    data = json.loads(output)
-                    if isinstance(data, dict):
-                        data = [data]
-                    claude_related_processes = data
-                except json.JSONDecodeError:
-                    pass
+            data = await _collect_claude_processes(include_terminals=bool(project_path))
+            claude_processes = data["claude"]
+            terminal_windows = data["terminals"]
+            claude_related_processes = data["related"]
 
             # 如果找到了 Claude 进程
             if claude_processes:
@@ -109,15 +198,13 @@ async def detect_project_claude_process(project_path: str = None) -> dict:
                 matched_terminal = None
 
                 if project_path:
-                    project_name = Path(project_path).name.lower()
-                    project_path_lower = project_path.lower().replace('/', '\\')
-                    # 提取项目路径中的字母数字部分用于模糊匹配（处理编码问题）
-                    project_path_ascii = re.sub(r'[^a-zA-Z0-9\\:/]', '', project_path_lower)
+                    project_name, project_path_lower, project_path_ascii = _project_match_keys(project_path)
+
+                    # 项目名是项目路径的最后一段，包含项目路径必然包含项目名，只需检查项目名
 
                     # 先检查命令行中是否包含项目路径
                     for proc_info in claude_processes:
-                        cmdline = proc_info.get('CmdLine', '').lower()
-                        if project_path_lower in cmdline or project_name in cmdline:
+                        if project_name in proc_info.get('CmdLine', '').lower():
                             matched_process = proc_info
                             result["match_type"] = "project"
                             logger.info(f"检测到项目 Claude 进程 (命令行匹配): 项目={project_name}, PID={proc_info.get('ProcessId')}")
@@ -125,23 +212,22 @@ async def detect_project_claude_process(project_path: str = None) -> dict:
 
                     # 检查 claude_related 中的 cmd.exe 命令行是否包含项目路径
                     if not matched_process and claude_related_processes:
+                        # 收集时已只保留 cmd.exe
                         for proc_info in claude_related_processes:
-                            if proc_info.get('Name', '').lower() == 'cmd.exe':
-                                cmdline = proc_info.get('CmdLine', '').lower()
-                                cmdline_ascii = re.sub(r'[^a-zA-Z0-9\\:/]', '', cmdline)
-                                # 使用 ASCII 版本匹配（处理中文乱码）
-                                if project_path_ascii in cmdline_ascii:
-                                    matched_process = claude_processes[0]
-                                    result["match_type"] = "project"
-                                    logger.info(f"检测到项目 Claude 进程 (cmd.exe 命令行匹配): 项目={project_name}")
-                                    break
+                            cmdline = proc_info.get('CmdLine', '').lower()
+                            # 原样包含时无需再过滤；否则使用 ASCII 版本匹配（处理中文乱码）
+                            if project_path_lower in cmdline or project_path_ascii in _PATH_NOISE_RE.sub('', cmdline):
+                                matched_process = claude_processes[0]
+                                result["match_type"] = "project"
+                                logger.info(f"检测到项目 Claude 进程 (cmd.exe 命令行匹配): 项目={project_name}")
+                                break
 
                     # 如果命令行没匹配到，检查终端窗口标题是否包含项目路径
                     if not matched_process and terminal_windows:
                         for terminal in terminal_windows:
                             title = terminal.get('MainWindowTitle', '').lower()
                             # 检查窗口标题是否包含项目路径或项目名
-                            if project_path_lower in title or project_name in title:
+                            if project_name in title:
                                 matched_terminal = terminal
                                 matched_process = claude_processes[0]  # 使用第一个 Claude 进程
                                 result["match_type"] = "project"
@@ -164,32 +250,14 @@ async def detect_project_claude_process(project_path: str = None) -> dict:
                 return result
 
             # 方法3: 备用 - 通过窗口标题检测（当命令行检测失败时）
-            ps_cmd_window = '''powershell -Command "Get-Process -ErrorAction SilentlyContinue | Where-Object { $_.MainWindowTitle -like '*claude*' } | Select-Object Id,MainWindowTitle | ConvertTo-Json -Compress"'''
-
-            proc = await asyncio.create_subprocess_shell(
-                ps_cmd_window,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await proc.communicate()
-            output = stdout.decode('utf-8', errors='replace').strip()
-
-            claude_windows = []
-            if output:
-                try:
-                    data = json.loads(output)
-                    if isinstance(data, dict):
-                        data = [data]
-                    claude_windows = data
-                except json.JSONDecodeError:
-                    pass
+            claude_windows = data["windows"]
 
             if claude_windows:
                 matched_window = None
 
                 # 如果有项目路径，尝试匹配项目名
                 if project_path:
-                    project_name = Path(project_path).name.lower()
+                    project_name = _project_match_keys(project_path)[0]
                     for win in claude_windows:
                         title = win.get('MainWindowTitle', '').lower()
                         # 检查窗口标题是否包含项目名
@@ -212,22 +280,11 @@ async def detect_project_claude_process(project_path: str = None) -> dict:
 
         else:
             # Linux/macOS - 使用 lsof 检查进程的工作目录
-            proc = await asyncio.create_subprocess_shell(
-                f'lsof +D "{project_path}" 2>/dev/null | grep -i claude | head -1 | awk \'{{print $2}}\'',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await proc.communicate()
-            output = stdout.decode('utf-8', errors='replace').strip()
-
-            if output:
-                try:
-                    pid = int(output)
-                    result["running"] = True
-                    result["pid"] = pid
-                    result["cwd"] = project_path
-                except ValueError:
-                    pass
+            pid = await _find_claude_pid_with_lsof(project_path) if project_path else None
+            if pid is not None:
+                result["running"] = True
+                result["pid"] = pid
+                result["cwd"] = project_path
 
     except Exception as e:
         logger.error(f"检测项目 Claude 进程失败: {e}")
@@ -235,8 +292,112 @@ async def detect_project_claude_process(project_path: str = None) -> dict:
     return result
 
 
-async def debug_claude_processes_handler(request: web.Request) -> web.Response:
-    """调试端点 - 列出所有可能的 Claude 相关进程"""
+async def _find_claude_pid_with_lsof(project_path: str) -> int | None:
+    """用 lsof 查找打开了项目目录下文件、且输出行包含 claude 的进程
+
+    直接执行 lsof（不经过 shell 管道），读到第一条匹配行即结束 lsof。
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "lsof", "+D", project_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+    except FileNotFoundError:
+        # 未安装 lsof
+        return None
+    pid = None
+    try:
+        async for line in proc.stdout:
+            text = line.decode('utf-8', errors='replace')
+            if 'claude' in text.lower():
+                fields = text.split()
+                if len(fields) > 1 and fields[1].isdigit():
+                    pid = int(fields[1])
+                break
+    finally:
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        await proc.wait()
+    return pid
+
+
+# 调试端点的进程查询，最多保留 50 条（-First 取够后即停止枚举）
+# 所有 Node.js 进程
+_DEBUG_NODE_PROCESSES_QUERY = '''Get-CimInstance Win32_Process -Filter "Name='node.exe'" | Select-Object -First 50 ProcessId,Name,@{N='CmdLine';E={$_.CommandLine.Substring(0, [Math]::Min(200, $_.CommandLine.Length))}}'''
+# 命令行包含 claude 或 anthropic 的进程
+_DEBUG_CLAUDE_RELATED_QUERY = '''Get-CimInstance Win32_Process | Where-Object { $_.CommandLine -match 'claude|anthropic' } | Select-Object -First 50 ProcessId,Name,@{N='CmdLine';E={$_.CommandLine.Substring(0, [Math]::Min(200, $_.CommandLine.Length))}}'''
+
+
+async def _iter_debug_sections():
+    """依次产出调试信息的各个部分 (键, 值)，供调试端点汇总或逐段输出"""
+    yield "platform", sys.platform
+
+    # 获取当前项目信息
+    projects = await load_recent_projects()
+    project_path = projects[0].get("path") if projects else None
+    yield "current_project", project_path
+    if project_path:
+        yield "project_name", Path(project_path).name
+
+    if sys.platform != "win32":
+        return
+
+    # PowerShell 查询和检测先行提交（在常驻进程中依次执行），与下面的 Win32 枚举重叠进行
+    node_task = asyncio.create_task(_ps_query(_DEBUG_NODE_PROCESSES_QUERY))
+    related_task = asyncio.create_task(_ps_query(_DEBUG_CLAUDE_RELATED_QUERY))
+    # 运行检测函数（绕过缓存），复用开头读取的项目路径
+    detect_task = asyncio.create_task(_scan_project_claude_process(project_path))
+    try:
+        # 获取所有有窗口标题的进程（Win32 API 枚举窗口）
+        processes, windows = await asyncio.gather(
+            asyncio.to_thread(list_processes),
+            asyncio.to_thread(list_windows)
+        )
+        names = {pid: name for pid, name in processes}
+        all_windows = [
+            {"Id": pid, "ProcessName": names.get(pid, '').rsplit('.', 1)[0], "MainWindowTitle": title}
+            for _hwnd, pid, title in windows
+        ]
+        yield "all_windows_with_title", all_windows
+
+        data, output1 = await node_task
+        if data:
+            yield "node_processes", data
+        elif output1:
+            yield "node_processes_raw", output1[:500]
+
+        data, output2 = await related_task
+        if data:
+            yield "claude_related", data
+        elif output2:
+            yield "claude_related_raw", output2[:500]
+
+        # 只保留包含 claude 的窗口或终端窗口
+        filtered = [p for p in all_windows
+                    if 'claude' in p['MainWindowTitle'].lower()
+                    or p['ProcessName'].lower() in ('cmd', 'powershell', 'windowsterminal')]
+        yield "terminal_windows", filtered[:10]  # 限制数量
+
+        yield "detection_results", await detect_task
+    finally:
+        # 提前结束（出错或客户端断开）时取消尚未完成的查询
+        for task in (node_task, related_task, detect_task):
+            task.cancel()
+
+
+async def debug_claude_processes_handler(request: web.Request) -> web.StreamResponse:
+    """调试端点 - 列出所有可能的 Claude 相关进程
+
+    ?format=ndjson 时每得到一部分就输出一行 {"section": 键, "data": 值}，
+    不必等全部查询完成、也不在内存中拼出完整结果。
+    """
+    if request.query.get("format") == "ndjson":
+        return await _stream_debug_sections(request)
+
     debug_info = {
         "platform": sys.platform,
         "detection_results": {},
@@ -249,101 +410,8 @@ async def debug_claude_processes_handler(request: web.Request) -> web.Response:
     }
 
     try:
-        # 获取当前项目信息
-        projects = await load_recent_projects()
-        project_path = projects[0].get("path") if projects else None
-        debug_info["current_project"] = project_path
-        if project_path:
-            debug_info["project_name"] = Path(project_path).name
-
-        # 获取所有有窗口标题的进程
-        if sys.platform == "win32":
-            ps_cmd_all = '''powershell -Command "Get-Process -ErrorAction SilentlyContinue | Where-Object { $_.MainWindowTitle -ne '' } | Select-Object Id,ProcessName,MainWindowTitle | ConvertTo-Json -Compress"'''
-            proc = await asyncio.create_subprocess_shell(
-                ps_cmd_all,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await proc.communicate()
-            output = stdout.decode('utf-8', errors='replace').strip()
-            if output:
-                try:
-                    data = json.loads(output)
-                    if isinstance(data, dict):
-                        data = [data]
-                    debug_info["all_windows_with_title"] = data
-                except json.JSONDecodeError:
-                    debug_info["all_windows_raw"] = output[:1000]
-        if sys.platform == "win32":
-            # 获取所有 Node.js 进程
-            ps_cmd1 = '''powershell -Command "Get-CimInstance Win32_Process | Where-Object { $_.Name -eq 'node.exe' } | Select-Object ProcessId,Name,@{N='CmdLine';E={$_.CommandLine.Substring(0, [Math]::Min(200, $_.CommandLine.Length))}} | ConvertTo-Json -Compress"'''
-            proc1 = await asyncio.create_subprocess_shell(
-                ps_cmd1,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout1, _ = await proc1.communicate()
-            output1 = stdout1.decode('utf-8', errors='replace').strip()
-
-            if output1:
-                try:
-                    data = json.loads(output1)
-                    if isinstance(data, dict):
-                        data = [data]
-                    debug_info["node_processes"] = data
-                except json.JSONDecodeError:
-                    debug_info["node_processes_raw"] = output1[:500]
-
-            # 获取命令行包含 claude 或 anthropic 的进程
-            ps_cmd2 = '''powershell -Command "Get-CimInstance Win32_Process | Where-Object { $_.CommandLine -match 'claude|anthropic' } | Select-Object ProcessId,Name,@{N='CmdLine';E={$_.CommandLine.Substring(0, [Math]::Min(200, $_.CommandLine.Length))}} | ConvertTo-Json -Compress"'''
-            proc2 = await asyncio.create_subprocess_shell(
-                ps_cmd2,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout2, _ = await proc2.communicate()
-            output2 = stdout2.decode('utf-8', errors='replace').strip()
-
-            if output2:
-                try:
-                    data = json.loads(output2)
-                    if isinstance(data, dict):
-                        data = [data]
-                    debug_info["claude_related"] = data
-                except json.JSONDecodeError:
-                    debug_info["claude_related_raw"] = output2[:500]
-
-            # 获取窗口标题
-            ps_cmd3 = '''powershell -Command "Get-Process | Where-Object { $_.MainWindowTitle -ne '' } | Select-Object Id,ProcessName,MainWindowTitle | ConvertTo-Json -Compress"'''
-            proc3 = await asyncio.create_subprocess_shell(
-                ps_cmd3,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout3, _ = await proc3.communicate()
-            output3 = stdout3.decode('utf-8', errors='replace').strip()
-
-            if output3:
-                try:
-                    data = json.loads(output3)
-                    if isinstance(data, dict):
-                        data = [data]
-                    # 只保留包含 claude 的窗口或终端窗口
-                    filtered = [p for p in data if 'claude' in p.get('MainWindowTitle', '').lower()
-                               or p.get('ProcessName', '').lower() in ('cmd', 'powershell', 'windowsterminal')]
-                    debug_info["terminal_windows"] = filtered[:10]  # 限制数量
-                except json.JSONDecodeError:
-                    debug_info["terminal_windows_raw"] = output3[:500]
-
-            # 获取当前项目路径
-            projects = await load_recent_projects()
-            project_path = projects[0].get("path") if projects else None
-            debug_info["current_project"] = project_path
-
-            # 运行检测函数
-            detection_result = await detect_project_claude_process(project_path)
-            debug_info["detection_results"] = detection_result
-
+        async for key, value in _iter_debug_sections():
+            debug_info[key] = value
     except Exception as e:
         debug_info["error"] = str(e)
         import traceback
@@ -352,6 +420,29 @@ async def debug_claude_processes_handler(request: web.Request) -> web.Response:
     return success_response(debug_info)
 
 
+async def _stream_debug_sections(request: web.Request) -> web.StreamResponse:
+    """以 NDJSON 逐段输出调试信息"""
+    response = web.StreamResponse()
+    response.content_type = 'application/x-ndjson'
+    response.charset = 'utf-8'
+    await response.prepare(request)
+
+    try:
+        async for key, value in _iter_debug_sections():
+            await response.write(json_dumps_bytes({"section": key, "data": value}) + b"\n")
+    except (ConnectionResetError, ConnectionAbortedError):
+        return response
+    except Exception as e:
+        import traceback
+        await response.write(json_dumps_bytes({
+            "section": "error",
+            "data": {"error": str(e), "traceback": traceback.format_exc()}
+        }) + b"\n")
+
+    await response.write_eof()
+    return response
+
+
 async def start_claude_handler(request: web.Request) -> web.Response:
     """处理 POST /api/claude/start 请求 - 启动 Claude Code 进程"""
     global claude_manager
@@ -368,6 +459,7 @@ async def start_claude_handler(request: web.Request) -> web.Response:
         claude_manager = ClaudeCodeManager(str(project_path), broadcast_sse_event)
 
     success = await claude_manager.start()
+    invalidate_claude_process_cache()
     if success:
         return success_response({
             "status": "starting",
@@ -389,6 +481,7 @@ async def stop_claude_handler(request: web.Request) -> web.Response:
         })
 
     success = await claude_manager.stop()
+    invalidate_claude_process_cache()
     if success:
         return success_response({
             "status": "stopped",
@@ -461,8 +554,10 @@ async def launch_claude_window_handler(request: web.Request) -> web.Response:
     try:
         if sys.platform == "win32":
             import subprocess
-            cmd = f'start cmd /k "cd /d {project_path} && {claude_cmd}"'
-            subprocess.Popen(cmd, shell=True)
+            # 直接以新控制台启动 cmd，不再经过 shell 执行 start；
+            # 命令行保持 cd /d ... && claude 的形式，进程检测依赖它匹配项目
+            cmd = f'cmd /k "cd /d {project_path} && {claude_cmd}"'
+            subprocess.Popen(cmd, creationflags=subprocess.CREATE_NEW_CONSOLE)
             logger.info(f"在新窗口中启动 Claude Code ({mode_label}): {project_path}")
         else:
             import subprocess
@@ -478,6 +573,7 @@ async def launch_claude_window_handler(request: web.Request) -> web.Response:
                         continue
             logger.info(f"在新终端中启动 Claude Code ({mode_label}): {project_path}")
 
+        invalidate_claude_process_cache()
         return success_response({
             "status": "launched",
             "message": f"Claude Code ({mode_label}) 已在新窗口中启动",
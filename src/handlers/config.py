@@ -4,12 +4,12 @@ BMAD GUI - Config Handlers
 """
 
 import logging
+import os
 from pathlib import Path
 
-import yaml
 from aiohttp import web
 
-from file_ops import load_recent_projects
+from file_ops import load_recent_projects, get_project_paths, load_yaml_file
 from .response import error_response, success_response
 
 logger = logging.getLogger("bmad-gui")
@@ -24,44 +24,41 @@ MODULE_DESCRIPTIONS = {
 def detect_installed_modules(project_path: Path) -> list:
     """检测已安装的 BMAD 模块"""
     modules = []
-    bmad_dir = project_path / ".bmad"
+    bmad_dir = get_project_paths(str(project_path)).bmad_dir
 
-    if not bmad_dir.exists():
+    # 一次 scandir 同时得到 bmm / core，目录类型来自 dirent，无需逐个 stat
+    try:
+        with os.scandir(bmad_dir) as entries:
+            found = {entry.name for entry in entries
+                     if entry.name in MODULE_DESCRIPTIONS and entry.is_dir()}
+    except OSError:
         return modules
 
-    # 检查 bmm 模块
-    if (bmad_dir / "bmm").exists():
-        modules.append({
-            "name": "bmm",
-            "description": MODULE_DESCRIPTIONS.get("bmm", ""),
-            "path": str(bmad_dir / "bmm")
-        })
-
-    # 检查 core 模块
-    if (bmad_dir / "core").exists():
-        modules.append({
-            "name": "core",
-            "description": MODULE_DESCRIPTIONS.get("core", ""),
-            "path": str(bmad_dir / "core")
-        })
+    for name in ("bmm", "core"):
+        if name in found:
+            modules.append({
+                "name": name,
+                "description": MODULE_DESCRIPTIONS.get(name, ""),
+                "path": str(bmad_dir / name)
+            })
 
     return modules
 
 
 def load_config_yaml(project_path: Path) -> dict:
     """加载项目的 config.yaml 配置"""
-    config_file = project_path / ".bmad" / "_cfg" / "config.yaml"
+    paths = get_project_paths(str(project_path))
+    config_file = paths.cfg_config
 
     if not config_file.exists():
         # 尝试其他位置
-        config_file = project_path / ".bmad" / "config.yaml"
+        config_file = paths.bmad_config
 
     if not config_file.exists():
         return {}
 
     try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f) or {}
+        return load_yaml_file(config_file) or {}
     except Exception as e:
         logger.error(f"读取配置文件失败: {e}")
         return {}
@@ -73,7 +70,7 @@ async def config_handler(request: web.Request) -> web.Response:
     if not projects:
         return error_response("FILE_NOT_FOUND", "没有打开的项目")
 
-    project_path = Path(projects[0].get("path", ""))
+    project_path = get_project_paths(projects[0].get("path", "")).root
     if not project_path.exists():
         return error_response("FILE_NOT_FOUND", "项目路径不存在")
 
@@ -4,11 +4,10 @@ BMAD GUI - Project Handlers
 """
 
 import logging
-from pathlib import Path
 
 from aiohttp import web
 
-from utils import validate_path_safety
+from utils import validate_path_safety, resolve_path_cached, clear_path_cache
 from file_ops import (
     is_bmad_project, parse_bmad_config,
     load_recent_projects, save_recent_projects, update_recent_projects,
@@ -105,7 +104,7 @@ async def create_project_handler(request: web.Request) -> web.Response:
         return error_response("INVALID_PATH", "缺少 path 参数")
 
     try:
-        path = Path(path_str).resolve()
+        path = resolve_path_cached(path_str)
     except (ValueError, OSError):
         return error_response("INVALID_PATH", "无效路径格式")
 
@@ -143,6 +142,9 @@ async def create_project_handler(request: web.Request) -> web.Response:
         logger.error(f"项目创建失败: {e}")
         return error_response("CREATE_FAILED", f"项目创建失败: {str(e)}")
 
+    # 新建的目录可能改变已缓存路径的解析结果
+    clear_path_cache()
+
     project_name = path.name
     await update_recent_projects(str(path), project_name)
 
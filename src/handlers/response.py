@@ -3,17 +3,22 @@ BMAD GUI - Response Helpers
 统一的响应格式
 """
 
-import json
+import os
+import zlib
+
 from aiohttp import web
+from aiohttp.helpers import ETag
 
 from config import ERROR_CODES
+from utils import json_dumps_bytes
 
 
 def json_response(data: dict, status: int = 200) -> web.Response:
-    """统一的 JSON 响应"""
+    """统一的 JSON 响应（直接序列化为 UTF-8 字节，省去 str 再编码一次）"""
     return web.Response(
-        text=json.dumps(data, ensure_ascii=False),
+        body=json_dumps_bytes(data),
         content_type='application/json',
+        charset='utf-8',
         status=status
     )
 
@@ -24,6 +29,32 @@ def error_response(code: str, message: str) -> web.Response:
     return json_response({'error': True, 'code': code, 'message': message}, status)
 
 
-def success_response(data: dict) -> web.Response:
-    """统一的成功响应"""
-    return json_response({'success': True, 'data': data})
+def success_response(data: dict, etag: str | None = None) -> web.Response:
+    """统一的成功响应，指定 etag 时附带弱 ETag 响应头"""
+    response = json_response({'success': True, 'data': data})
+    if etag is not None:
+        response.etag = ETag(value=etag, is_weak=True)
+    return response
+
+
+def file_etag(path: os.PathLike, *extra: str) -> str:
+    """根据文件的 mtime、大小和路径（以及 extra）生成 ETag 值
+
+    只需一次 stat，文件内容变化或换成其他文件时 ETag 随之变化。
+    """
+    st = os.stat(path)
+    key = "\0".join((os.fspath(path), *extra)).encode('utf-8', 'surrogatepass')
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}-{zlib.crc32(key):x}"
+
+
+def not_modified_response(request: web.Request, etag: str) -> web.Response | None:
+    """请求的 If-None-Match 与 etag 匹配时返回 304 响应，否则返回 None"""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    # If-None-Match 使用弱比较，只比较值
+    if any(tag.value == etag or tag.value == '*' for tag in if_none_match):
+        response = web.Response(status=304)
+        response.etag = ETag(value=etag, is_weak=True)
+        return response
+    return None
@@ -3,66 +3,137 @@ BMAD GUI - SSE Handlers
 Server-Sent Events 处理器
 """
 
-import json
 import asyncio
 import logging
+import time
+import uuid
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Set
+from typing import Dict
 
-import yaml
 from aiohttp import web
 
-from config import SSE_RETRY_TIMEOUT
-from file_ops import find_workflow_status_file
-from .workflow import parse_workflow_status
+from config import SSE_RETRY_TIMEOUT, SSE_REPLAY_BUFFER_SIZE, SSE_WRITE_TIMEOUT
+from utils import json_dumps_bytes
+from file_ops import find_workflow_status_file, load_yaml_cached_async
+from .workflow import parse_workflow_status, WORKFLOW_STATUS_KEYS
 
 logger = logging.getLogger("bmad-gui")
 
-# SSE 客户端管理
-sse_clients: Set[web.StreamResponse] = set()
+# SSE 客户端管理: 响应 -> 关闭事件（置位后对应的 sse_handler 返回）
+sse_clients: Dict[web.StreamResponse, asyncio.Event] = {}
 current_project_path: Path | None = None
 
+# 空闲时每次心跳后间隔放大的倍数
+HEARTBEAT_BACKOFF = 1.5
+# 最近一次广播非心跳事件的时间（time.monotonic()）
+_last_event_time = 0.0
+
+# 最近广播的事件: (事件序号, 已序列化的帧)，心跳不编号也不记录
+_event_log: deque[tuple[int, bytes]] = deque(maxlen=SSE_REPLAY_BUFFER_SIZE)
+# 事件 ID 的纪元：每次启动和切换项目时重新生成，事件 ID 为 "{纪元}-{序号}"，
+# 其他纪元的 Last-Event-ID（服务器重启前或切换项目前的事件）一律改发完整状态
+_event_epoch = uuid.uuid4().hex[:12]
+# 当前纪元内最近分配的事件序号（从 1 开始递增）
+_last_event_id = 0
+
+
+def _new_event_epoch() -> None:
+    """开始新的事件纪元：清空事件记录，之前的事件 ID 全部失效"""
+    global _event_epoch, _last_event_id
+    _event_epoch = uuid.uuid4().hex[:12]
+    _last_event_id = 0
+    _event_log.clear()
+
 
 def set_current_project(path: Path | None):
-    """设置当前项目路径"""
+    """设置当前项目路径
+
+    切换项目后旧项目的事件不再适用，开始新的事件纪元，重连的客户端改为接收完整状态。
+    """
     global current_project_path
+    if path != current_project_path:
+        _new_event_epoch()
     current_project_path = path
 
 
-def get_sse_clients() -> Set[web.StreamResponse]:
-    """获取 SSE 客户端集合"""
-    return sse_clients
+def close_sse_client(response: web.StreamResponse) -> None:
+    """移除 SSE 客户端并通知其 sse_handler 结束"""
+    close_event = sse_clients.pop(response, None)
+    if close_event is not None:
+        close_event.set()
 
 
-async def send_sse_event(response: web.StreamResponse, event_type: str, data: dict) -> bool:
-    """发送 SSE 事件到客户端"""
+def close_all_sse_clients() -> None:
+    """关闭所有 SSE 客户端"""
+    for response in list(sse_clients):
+        close_sse_client(response)
+
+
+def format_sse_event(event_type: str, data: dict) -> bytes:
+    """将事件序列化为 SSE 帧（UTF-8 字节串，可直接写入响应）"""
+    return b"event: %s\ndata: %s\n\n" % (event_type.encode('utf-8'), json_dumps_bytes(data))
+
+
+# 新连接的开场帧（重连间隔 + connected 事件）内容固定，只序列化一次
+_SSE_PREAMBLE = (
+    b"retry: %d\n\n" % SSE_RETRY_TIMEOUT
+    + format_sse_event("connected", {"message": "SSE 连接已建立"})
+)
+
+
+async def send_sse_frame(response: web.StreamResponse, frame: bytes) -> bool:
+    """写入已序列化的 SSE 帧，连接断开或写入失败时返回 False
+
+    发送缓冲区超过上限时 write 会等待排空；客户端长时间不读取数据时
+    按超时处理并视为断开，避免积压的数据无限增长。
+    """
     try:
-        event_data = json.dumps(data, ensure_ascii=False)
-        message = f"event: {event_type}\ndata: {event_data}\n\n"
-        await response.write(message.encode('utf-8'))
+        await asyncio.wait_for(response.write(frame), SSE_WRITE_TIMEOUT)
         return True
     except (ConnectionResetError, ConnectionAbortedError):
         return False
+    except asyncio.TimeoutError:
+        logger.warning(f"SSE 客户端写入超时（{SSE_WRITE_TIMEOUT} 秒），断开连接")
+        return False
     except Exception as e:
         logger.error(f"SSE 发送失败: {e}")
         return False
 
 
+async def send_sse_event(response: web.StreamResponse, event_type: str, data: dict) -> bool:
+    """发送 SSE 事件到客户端"""
+    return await send_sse_frame(response, format_sse_event(event_type, data))
+
+
 async def broadcast_sse_event(event_type: str, data: dict) -> None:
-    """广播 SSE 事件到所有客户端"""
+    """广播 SSE 事件到所有客户端
+
+    事件只序列化一次，各客户端并发写入，慢客户端不会阻塞其他客户端。
+    非心跳事件带有递增的 id 并记录到 _event_log（没有客户端时也记录），
+    断线重连的客户端可按 Last-Event-ID 补发错过的事件。
+    """
+    global _last_event_time, _last_event_id
+    frame = format_sse_event(event_type, data)
+    if event_type != "heartbeat":
+        _last_event_time = time.monotonic()
+        _last_event_id += 1
+        frame = b"id: %s-%d\n" % (_event_epoch.encode('ascii'), _last_event_id) + frame
+        _event_log.append((_last_event_id, frame))
     if not sse_clients:
         return
 
-    disconnected = set()
-    for client in sse_clients:
-        success = await send_sse_event(client, event_type, data)
-        if not success:
-            disconnected.add(client)
+    clients = list(sse_clients)
+    results = await asyncio.gather(
+        *(send_sse_frame(client, frame) for client in clients),
+        return_exceptions=True
+    )
 
-    for client in disconnected:
-        sse_clients.discard(client)
-        logger.debug(f"移除断开的 SSE 客户端，当前连接数: {len(sse_clients)}")
+    for client, success in zip(clients, results):
+        if success is not True:
+            close_sse_client(client)
+            logger.debug(f"移除断开的 SSE 客户端，当前连接数: {len(sse_clients)}")
 
 
 async def send_current_workflow_status(response: web.StreamResponse) -> None:
@@ -75,14 +146,38 @@ async def send_current_workflow_status(response: web.StreamResponse) -> None:
         return
 
     try:
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
-        result = parse_workflow_status(yaml_data, current_project_path)
+        # 重连的客户端在状态文件未变化时复用已解析的 YAML
+        yaml_data = await load_yaml_cached_async(yaml_file, WORKFLOW_STATUS_KEYS)
+        result = await asyncio.to_thread(parse_workflow_status, yaml_data, current_project_path)
         await send_sse_event(response, "workflow_update", result)
     except Exception as e:
         logger.error(f"发送工作流状态失败: {e}")
 
 
+def _missed_event_frames(last_event_id: str | None) -> list[bytes] | None:
+    """根据客户端的 Last-Event-ID 取出其错过的事件帧
+
+    Returns:
+        需要补发的帧列表；无法确定（首次连接、ID 无效、服务器已重启、已切换项目或
+        缓冲区已不包含全部缺失事件）时返回 None
+    """
+    if not last_event_id:
+        return None
+    epoch, _, seq = last_event_id.rpartition("-")
+    if epoch != _event_epoch:
+        return None
+    try:
+        last_id = int(seq)
+    except ValueError:
+        return None
+    if last_id < 0 or last_id > _last_event_id:
+        return None
+    oldest_id = _event_log[0][0] if _event_log else _last_event_id + 1
+    if last_id < oldest_id - 1:
+        return None
+    return [frame for event_id, frame in _event_log if event_id > last_id]
+
+
 async def sse_handler(request: web.Request) -> web.StreamResponse:
     """处理 GET /api/events 请求 - SSE 事件流"""
     response = web.StreamResponse()
@@ -93,34 +188,49 @@ async def sse_handler(request: web.Request) -> web.StreamResponse:
 
     await response.prepare(request)
 
-    sse_clients.add(response)
+    close_event = asyncio.Event()
+    sse_clients[response] = close_event
     logger.info(f"新 SSE 客户端连接，当前连接数: {len(sse_clients)}")
 
-    await response.write(f"retry: {SSE_RETRY_TIMEOUT}\n\n".encode('utf-8'))
-    await send_sse_event(response, "connected", {"message": "SSE 连接已建立"})
+    missed = _missed_event_frames(request.headers.get('Last-Event-ID'))
 
-    if current_project_path:
+    if not await send_sse_frame(response, _SSE_PREAMBLE):
+        close_sse_client(response)
+    elif missed is not None:
+        # 重连：只补发断线期间错过的事件，无需重新读取状态文件
+        if missed and not await send_sse_frame(response, b"".join(missed)):
+            close_sse_client(response)
+    elif current_project_path:
         await send_current_workflow_status(response)
 
     try:
-        while True:
-            await asyncio.sleep(1)
-            if response not in sse_clients:
-                break
+        # 写入失败（客户端断开）或服务器关闭时由 close_sse_client 唤醒
+        await close_event.wait()
     except asyncio.CancelledError:
         pass
     finally:
-        sse_clients.discard(response)
+        close_sse_client(response)
         logger.info(f"SSE 客户端断开，当前连接数: {len(sse_clients)}")
 
     return response
 
 
 async def sse_heartbeat_task() -> None:
-    """SSE 心跳任务"""
-    from config import SSE_HEARTBEAT_INTERVAL
+    """SSE 心跳任务
+
+    没有其他事件时心跳间隔按 HEARTBEAT_BACKOFF 逐步放大到上限，
+    期间出现过事件则恢复默认间隔。
+    """
+    from config import SSE_HEARTBEAT_INTERVAL, SSE_HEARTBEAT_MAX_INTERVAL
+    interval = SSE_HEARTBEAT_INTERVAL
+    last_seen = _last_event_time
     while True:
-        await asyncio.sleep(SSE_HEARTBEAT_INTERVAL)
+        await asyncio.sleep(interval)
+        if _last_event_time != last_seen:
+            last_seen = _last_event_time
+            interval = SSE_HEARTBEAT_INTERVAL
+        else:
+            interval = min(interval * HEARTBEAT_BACKOFF, SSE_HEARTBEAT_MAX_INTERVAL)
         if sse_clients:
             await broadcast_sse_event("heartbeat", {"timestamp": datetime.now().isoformat()})
-            logger.debug(f"发送心跳，当前连接数: {len(sse_clients)}")
+            logger.debug(f"发送心跳，当前连接数: {len(sse_clients)}，下次间隔: {interval:.0f} 秒")
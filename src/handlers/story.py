@@ -4,112 +4,139 @@ Story 状态 API 处理器
 """
 
 import logging
+import re
+import sys
 from pathlib import Path
 
 import yaml
 from aiohttp import web
 
-from file_ops import load_recent_projects, find_sprint_status_file
-from .response import error_response, success_response
+from file_ops import (
+    get_active_project_path, find_sprint_status_file, load_yaml_cached_async, yaml_cache_generation
+)
+from .response import error_response, success_response, file_etag, not_modified_response
 
 logger = logging.getLogger("bmad-gui")
 
 
-def parse_story_id(story_key: str) -> dict:
+# Sprint 状态文件中用到的顶层键，读取时只构造这些键
+DEV_STATUS_KEYS = ("development_status",)
+
+# 上次驻留的 (load_yaml_cached 返回的解析结果, 状态字符串驻留后的 development_status)
+_interned_dev_status: tuple[object, dict] | None = None
+
+
+async def _get_dev_status(yaml_file: Path) -> dict:
+    """读取 Sprint 状态文件中的 development_status
+
+    解析、缓存和并发去重都交给 load_yaml_cached_async（只构造 development_status 子树），
+    写入文件后由 invalidate_yaml_cache 统一作废。状态值（done、backlog 等）经 sys.intern
+    驻留，各 Story 共用同一个字符串对象，只为节省内存，比较时仍使用 ==；
+    解析结果未变化（同一个对象）时直接复用上次驻留的字典。返回的字典是共享的，不能原地修改。
+    """
+    global _interned_dev_status
+    data = await load_yaml_cached_async(yaml_file, DEV_STATUS_KEYS)
+    cached = _interned_dev_status
+    if cached and cached[0] is data:
+        return cached[1]
+    source = data.get("development_status") if isinstance(data, dict) else None
+    dev_status = {
+        key: sys.intern(status) if type(status) is str else status
+        for key, status in (source or {}).items()
+    }
+    _interned_dev_status = (data, dev_status)
+    return dev_status
+
+
+# Story key: {epic 编号}-{story 编号}[-{名称}]
+_STORY_KEY_RE = re.compile(r'(\d+)-(\d+)(?:-(.*))?\Z', re.DOTALL)
+
+
+def parse_story_id(story_key: str) -> dict | None:
     """解析 story key 获取 epic 和 story 编号"""
-    parts = story_key.split("-")
-    if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
-        epic_num = int(parts[0])
-        story_num = parts[1]
-        story_name = "-".join(parts[2:]).replace("-", " ").title() if len(parts) > 2 else story_key
-        return {
-            "epicNumber": epic_num,
-            "storyNumber": story_num,
-            "storyId": f"{epic_num}-{story_num}",
-            "name": story_name
-        }
-    return None
-
-
-def get_active_story(dev_status: dict) -> dict:
-    """从开发状态中获取当前活跃的 Story"""
-    # 按 Epic 编号组织 Stories
-    epics = {}
+    m = _STORY_KEY_RE.match(story_key)
+    if m is None:
+        return None
+    epic_num = int(m[1])
+    story_num = m[2]
+    tail = m[3]
+    story_name = tail.replace("-", " ").title() if tail is not None else story_key
+    return {
+        "epicNumber": epic_num,
+        "storyNumber": story_num,
+        "storyId": f"{epic_num}-{story_num}",
+        "name": story_name
+    }
+
+
+def get_active_story(dev_status: dict) -> dict | None:
+    """从开发状态中获取当前活跃的 Story
+
+    单次遍历：记录各 Epic 的 id 和状态，同时保留 (Epic 编号, Story 编号) 最小的
+    未完成 Story（按整数比较，1-2 排在 1-10 之前），不为每个 Epic 构建 Story 列表，内存占用与 Story 数量无关。
+    """
+    # Epic 编号 -> (id, 状态)
+    epic_meta = {}
+    # ((Epic 编号, Story 编号), key, story_info, status)
+    best = None
 
     for key, status in dev_status.items():
-        # 解析 Epic
-        if key.startswith("epic-") and key.count("-") == 1:
-            epic_num_str = key.split("-")[1]
+        if key.startswith("epic-"):
+            # 解析 Epic（同一编号以第一次出现的 key 作为 id，状态取最后一次）
+            # 前缀之后全是数字即为 epic-N（不含其他 "-"，如 epic-N-retrospective）
+            epic_num_str = key[5:]
             if epic_num_str.isdigit():
                 epic_num = int(epic_num_str)
-                if epic_num not in epics:
-                    epics[epic_num] = {
-                        "id": key,
-                        "number": epic_num,
-                        "status": status,
-                        "stories": []
-                    }
-                else:
-                    epics[epic_num]["status"] = status
-
-    # 解析 Stories
-    for key, status in dev_status.items():
-        if key.startswith("epic-") or key.endswith("-retrospective"):
+                meta = epic_meta.get(epic_num)
+                epic_meta[epic_num] = (meta[0] if meta else key, status)
+            continue
+        if key.endswith("-retrospective") or status == "done":
             continue
 
         story_info = parse_story_id(key)
         if story_info:
-            epic_num = story_info["epicNumber"]
-            if epic_num not in epics:
-                epics[epic_num] = {
-                    "id": f"epic-{epic_num}",
-                    "number": epic_num,
-                    "status": "backlog",
-                    "stories": []
-                }
-
-            epics[epic_num]["stories"].append({
-                "id": key,
-                "storyId": story_info["storyId"],
-                "name": story_info["name"],
-                "status": status
-            })
-
-    # 按 Epic 编号排序，找到第一个非 done 的 Story
-    for epic_num in sorted(epics.keys()):
-        epic = epics[epic_num]
-        # 按 story 编号排序
-        stories = sorted(epic["stories"], key=lambda s: s["storyId"])
-
-        for story in stories:
-            if story["status"] != "done":
-                return {
-                    **story,
-                    "epicId": epic["id"],
-                    "epicNumber": epic["number"],
-                    "epicStatus": epic["status"]
-                }
-
-    return None
+            # 严格小于：编号相同时保留先出现的 Story
+            rank = (story_info["epicNumber"], int(story_info["storyNumber"]))
+            if best is None or rank < best[0]:
+                best = (rank, key, story_info, status)
+
+    if best is None:
+        return None
+
+    (epic_num, _), key, story_info, status = best
+    # 没有 epic-N 条目的 Epic 使用默认 id 和 backlog 状态
+    epic_id, epic_status = epic_meta.get(epic_num) or (f"epic-{epic_num}", "backlog")
+    return {
+        "id": key,
+        "storyId": story_info["storyId"],
+        "name": story_info["name"],
+        "status": status,
+        "epicId": epic_id,
+        "epicNumber": epic_num,
+        "epicStatus": epic_status
+    }
 
 
 async def get_active_story_handler(request: web.Request) -> web.Response:
     """处理 GET /api/story/active 请求 - 返回当前活跃的 Story"""
-    projects = await load_recent_projects()
-    if not projects:
+    project_path = await get_active_project_path()
+    if project_path is None:
         return error_response("FILE_NOT_FOUND", "没有打开的项目")
 
-    project_path = Path(projects[0].get("path", ""))
-    if not project_path.exists():
-        return error_response("FILE_NOT_FOUND", "项目路径不存在")
-
     yaml_file = find_sprint_status_file(project_path)
     if not yaml_file:
+        # 找不到状态文件时才检查项目目录本身，正常路径少一次 stat
+        if not project_path.exists():
+            return error_response("FILE_NOT_FOUND", "项目路径不存在")
         return error_response("FILE_NOT_FOUND", "Sprint 状态文件不存在")
 
     try:
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        # 状态文件未变化时客户端已有的响应仍然有效，直接返回 304
+        etag = file_etag(yaml_file, f"{yaml_cache_generation():x}")
+        not_modified = not_modified_response(request, etag)
+        if not_modified:
+            return not_modified
+        dev_status = await _get_dev_status(yaml_file)
     except yaml.YAMLError as e:
         logger.error(f"YAML 解析失败: {e}")
         return error_response("PARSE_ERROR", f"Sprint 状态文件解析失败: {str(e)}")
@@ -117,16 +144,15 @@ async def get_active_story_handler(request: web.Request) -> web.Response:
         logger.error(f"读取文件失败: {e}")
         return error_response("FILE_NOT_FOUND", f"无法读取 Sprint 状态文件: {str(e)}")
 
-    dev_status = yaml_data.get("development_status", {})
     active_story = get_active_story(dev_status)
 
     if active_story:
-        return success_response(active_story)
+        return success_response(active_story, etag)
     else:
         return success_response({
             "message": "所有 Story 已完成",
             "completed": True
-        })
+        }, etag)
 
 
 async def get_story_detail_handler(request: web.Request) -> web.Response:
@@ -135,40 +161,41 @@ async def get_story_detail_handler(request: web.Request) -> web.Response:
     if not story_id:
         return error_response("INVALID_PATH", "缺少 story_id 参数")
 
-    projects = await load_recent_projects()
-    if not projects:
-        return error_response("FILE_NOT_FOUND", "没有打开的项目")
+    # 先校验 ID 格式，无效的 ID 不必读取状态文件
+    story_info = parse_story_id(story_id)
+    if not story_info:
+        return error_response("PARSE_ERROR", f"无法解析 Story ID: {story_id}")
 
-    project_path = Path(projects[0].get("path", ""))
-    if not project_path.exists():
-        return error_response("FILE_NOT_FOUND", "项目路径不存在")
+    project_path = await get_active_project_path()
+    if project_path is None:
+        return error_response("FILE_NOT_FOUND", "没有打开的项目")
 
     yaml_file = find_sprint_status_file(project_path)
     if not yaml_file:
+        # 找不到状态文件时才检查项目目录本身，正常路径少一次 stat
+        if not project_path.exists():
+            return error_response("FILE_NOT_FOUND", "项目路径不存在")
         return error_response("FILE_NOT_FOUND", "Sprint 状态文件不存在")
 
     try:
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        etag = file_etag(yaml_file, story_id, f"{yaml_cache_generation():x}")
+        not_modified = not_modified_response(request, etag)
+        if not_modified:
+            return not_modified
+        dev_status = await _get_dev_status(yaml_file)
     except Exception as e:
         logger.error(f"读取文件失败: {e}")
         return error_response("FILE_NOT_FOUND", f"无法读取 Sprint 状态文件: {str(e)}")
 
-    dev_status = yaml_data.get("development_status", {})
-
     # 查找指定的 Story
     status = dev_status.get(story_id)
     if status is None:
         return error_response("FILE_NOT_FOUND", f"Story {story_id} 不存在")
 
-    story_info = parse_story_id(story_id)
-    if not story_info:
-        return error_response("PARSE_ERROR", f"无法解析 Story ID: {story_id}")
-
     return success_response({
         "id": story_id,
         "storyId": story_info["storyId"],
         "name": story_info["name"],
         "status": status,
         "epicNumber": story_info["epicNumber"]
-    })
+    }, etag)
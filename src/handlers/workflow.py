@@ -3,30 +3,47 @@ BMAD GUI - Workflow Handlers
 工作流状态 API 处理器
 """
 
+import asyncio
+import functools
 import logging
+import os
+import re
+import time
+from collections import defaultdict
 from pathlib import Path
 
 import yaml
 from aiohttp import web
 
-from file_ops import load_recent_projects, find_workflow_status_file, find_sprint_status_file
+from file_ops import (
+    load_recent_projects, find_workflow_status_file, find_sprint_status_file,
+    load_yaml_file, load_yaml_cached, load_yaml_cached_async, save_yaml_file, YamlLoader
+)
 from .response import error_response, success_response
 
 logger = logging.getLogger("bmad-gui")
 
 
+# YAML 中的 status 值（小写）到前端状态的映射，其余值按输出文件路径判断
+_WORKFLOW_STATUS_MAP = {
+    "required": "pending",
+    "optional": "optional",
+    "recommended": "recommended",
+    "conditional": "conditional",
+    "skipped": "skipped",
+    "in_progress": "in_progress",
+    "blocked": "blocked",
+}
+
+
 def map_workflow_status(status: str) -> str:
     """将 YAML 中的 status 值映射为前端状态"""
     if not status:
         return "pending"
-    status_lower = status.lower()
-    if status_lower == "required":
-        return "pending"
-    if status_lower in ("optional", "recommended", "conditional"):
-        return status_lower
-    if status_lower in ("skipped", "in_progress", "blocked"):
-        return status_lower
-    if "/" in status or status.endswith(".md") or status.endswith(".yaml"):
+    mapped = _WORKFLOW_STATUS_MAP.get(status.lower())
+    if mapped is not None:
+        return mapped
+    if "/" in status or status.endswith((".md", ".yaml")):
         return "completed"
     return "pending"
 
@@ -44,50 +61,114 @@ WORKFLOW_OUTPUT_FILES = {
     "sprint-planning": ["md/sprint-status.yaml", "sprint-status.yaml"],
 }
 
-# 快速模式 Implementation 阶段流程
+# 不影响阶段完成状态的工作流状态
+_NON_BLOCKING_STATUSES = frozenset(("skipped", "optional", "recommended", "conditional"))
+
+# 快速模式 Implementation 阶段流程（没有 check 的步骤按 WORKFLOW_OUTPUT_FILES 检查输出文件）
 QUICK_MODE_IMPL_FLOW = [
-    {"id": "tech-spec", "name": "技术规格", "files": ["md/tech-spec.md", "tech-spec.md"]},
-    {"id": "create-epics-and-stories", "name": "Epic 分解", "files": ["md/epics.md", "epics.md"]},
+    {"id": "tech-spec", "name": "技术规格"},
+    {"id": "create-epics-and-stories", "name": "Epic 分解"},
     {"id": "sprint-planning", "name": "冲刺规划", "check": "sprint_has_stories"},
 ]
 
 # 标准模式 Implementation 阶段流程
 STANDARD_MODE_IMPL_FLOW = [
-    {"id": "product-brief", "name": "产品简介", "files": ["md/product-brief.md", "product-brief.md"]},
-    {"id": "prd", "name": "需求文档", "files": ["md/prd.md", "prd.md"]},
-    {"id": "architecture", "name": "架构设计", "files": ["md/architecture.md", "architecture.md"]},
-    {"id": "create-epics-and-stories", "name": "Epic 分解", "files": ["md/epics.md", "epics.md"]},
+    {"id": "product-brief", "name": "产品简介"},
+    {"id": "prd", "name": "需求文档"},
+    {"id": "architecture", "name": "架构设计"},
+    {"id": "create-epics-and-stories", "name": "Epic 分解"},
     {"id": "sprint-planning", "name": "冲刺规划", "check": "sprint_has_stories"},
 ]
 
 
-def check_workflow_file_exists(project_path: Path, workflow_id: str) -> str | None:
-    """检查工作流对应的输出文件是否存在
-    
+# 目录 mtime 距今不足该时长（纳秒）时不缓存列表：粒度较粗的文件系统上，
+# 同一时间片内新建的文件不会改变目录 mtime，缓存的列表可能一直缺少这些文件
+_DIR_LISTING_SETTLE_NS = 2_000_000_000
+
+
+@functools.lru_cache(maxsize=32)
+def _scan_dir(dir_path: str, mtime_ns: int) -> tuple[tuple[str, ...], frozenset[str]]:
+    """一次 scandir 列出目录内容，按 (目录路径, 目录 mtime) 缓存
+
+    Returns:
+        (按 scandir 顺序的条目名, 经 os.path.normcase 处理的条目名集合)
+    """
+    with os.scandir(dir_path) as it:
+        names = tuple(entry.name for entry in it)
+    return names, frozenset(os.path.normcase(name) for name in names)
+
+
+def _dir_entries(dir_path: Path) -> tuple[tuple[str, ...], frozenset[str]] | None:
+    """列出目录内容（见 _scan_dir），目录不存在时返回 None
+
+    目录内文件增删会改变目录 mtime，未变化时只需一次 stat，
+    代替对目录中每个候选文件分别 exists()/glob()。
+    """
+    try:
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+        if time.time_ns() - mtime_ns < _DIR_LISTING_SETTLE_NS:
+            return _scan_dir.__wrapped__(str(dir_path), mtime_ns)
+        return _scan_dir(str(dir_path), mtime_ns)
+    except (NotADirectoryError, FileNotFoundError):
+        return None
+
+
+def _path_exists(project_path: Path, relative_path: str) -> bool:
+    """检查项目内的相对路径是否存在（通过所在目录的列表判断）"""
+    parent, _, name = relative_path.rpartition("/")
+    entries = _dir_entries(project_path / parent if parent else project_path)
+    return entries is not None and os.path.normcase(name) in entries[1]
+
+
+def _find_first_story_file(story_dir: Path, entries: tuple[tuple[str, ...], frozenset[str]],
+                           story_id: str) -> Path | None:
+    """从目录列表中找出第一个以 story_id 开头的 .md 文件（等同 glob(f"{story_id}-*.md") 的第一项）
+
+    找到后立即返回，只为匹配的文件构造 Path。
+    """
+    prefix = os.path.normcase(f"{story_id}-")
+    suffix = os.path.normcase(".md")
+    for name in entries[0]:
+        normalized = os.path.normcase(name)
+        if normalized.startswith(prefix) and normalized.endswith(suffix):
+            return story_dir / name
+    return None
+
+
+def collect_workflow_outputs(project_path: Path) -> dict[str, str]:
+    """检查各工作流的输出文件是否存在
+
+    项目根目录和 md/ 各只列出一次，一个请求内的所有检查共用这份结果。
+
     Args:
         project_path: 项目根目录路径
-        workflow_id: 工作流 ID
-        
+
     Returns:
-        如果文件存在，返回文件相对路径；否则返回 None
+        {工作流 ID: 已存在的输出文件相对路径}，没有输出文件的工作流不在其中
     """
-    possible_files = WORKFLOW_OUTPUT_FILES.get(workflow_id, [])
-    for file_path in possible_files:
-        full_path = project_path / file_path
-        if full_path.exists():
-            return file_path
-    return None
+    listings = {}
+    outputs = {}
+    for workflow_id, possible_files in WORKFLOW_OUTPUT_FILES.items():
+        for file_path in possible_files:
+            parent, _, name = file_path.rpartition("/")
+            if parent not in listings:
+                listings[parent] = _dir_entries(project_path / parent if parent else project_path)
+            entries = listings[parent]
+            if entries is not None and os.path.normcase(name) in entries[1]:
+                outputs[workflow_id] = file_path
+                break
+    return outputs
 
 
 def check_sprint_has_stories(project_path: Path) -> bool:
-    """检查 sprint-status.yaml 是否包含 development_status 内容"""
-    import yaml
+    """检查 sprint-status.yaml 是否包含 development_status 内容
+
+    与 Sprint 状态接口共用 load_yaml_cached 的解析结果，文件未变化时不重新解析。
+    """
     for file_name in ["md/sprint-status.yaml", "sprint-status.yaml"]:
-        file_path = project_path / file_name
-        if file_path.exists():
+        if _path_exists(project_path, file_name):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = yaml.safe_load(f)
+                data = load_yaml_cached(project_path / file_name)
                 if data and data.get("development_status"):
                     return True
             except Exception:
@@ -95,17 +176,21 @@ def check_sprint_has_stories(project_path: Path) -> bool:
     return False
 
 
-def get_implementation_flow_status(project_path: Path, track_mode: str = "quick") -> dict:
+def get_implementation_flow_status(project_path: Path, track_mode: str = "quick",
+                                   outputs: dict[str, str] | None = None) -> dict:
     """获取 Implementation 阶段的流程状态
     
     Args:
         project_path: 项目根目录路径
         track_mode: 轨道模式 ("quick" 或 "standard")
+        outputs: 已收集的工作流输出文件（见 collect_workflow_outputs），未提供时重新收集
         
     Returns:
         包含流程状态和下一步建议的字典
     """
     flow = QUICK_MODE_IMPL_FLOW if track_mode == "quick" else STANDARD_MODE_IMPL_FLOW
+    if outputs is None:
+        outputs = collect_workflow_outputs(project_path)
     
     completed_steps = []
     next_step = None
@@ -124,14 +209,7 @@ def get_implementation_flow_status(project_path: Path, track_mode: str = "quick"
                 completed_steps.append({"id": step_id, "name": step_name, "status": "pending"})
         else:
             # 文件检查
-            files = step.get("files", [])
-            found = False
-            for file_path in files:
-                if (project_path / file_path).exists():
-                    found = True
-                    break
-            
-            if found:
+            if step_id in outputs:
                 completed_steps.append({"id": step_id, "name": step_name, "status": "completed"})
             else:
                 if next_step is None:
@@ -148,25 +226,14 @@ def get_implementation_flow_status(project_path: Path, track_mode: str = "quick"
     }
 
 
-def calculate_phase_status(workflows: list) -> str:
-    """计算阶段状态"""
-    statuses = [w.get("status", "pending") for w in workflows]
+# parse_workflow_status 用到的工作流状态文件顶层键，读取时只构造这些键
+WORKFLOW_STATUS_KEYS = ("project", "selected_track", "workflow_status")
 
-    if "in_progress" in statuses:
-        return "in_progress"
-    if "blocked" in statuses:
-        return "blocked"
 
-    non_blocking_statuses = {"skipped", "optional", "recommended", "conditional"}
-    required_statuses = [s for s in statuses if s not in non_blocking_statuses]
-
-    if required_statuses and all(s == "completed" for s in required_statuses):
-        return "completed"
-
-    if not required_statuses:
-        return "completed"
-
-    return "pending"
+@functools.lru_cache(maxsize=16)
+def _parse_yaml_string(text: str):
+    """解析嵌入在 YAML 中的 YAML 字符串，相同内容直接复用上次的结果（只读，不能原地修改）"""
+    return yaml.load(text, Loader=YamlLoader)
 
 
 def parse_workflow_status(yaml_data: dict, project_path: Path = None) -> dict:
@@ -189,7 +256,7 @@ def parse_workflow_status(yaml_data: dict, project_path: Path = None) -> dict:
     # 如果 workflow_status 是字符串（YAML 使用 | 语法），需要再次解析
     if isinstance(workflow_status, str):
         try:
-            parsed = yaml.safe_load(workflow_status)
+            parsed = _parse_yaml_string(workflow_status)
             if isinstance(parsed, dict) and "phases" in parsed:
                 workflow_status = parsed.get("phases", [])
             elif isinstance(parsed, list):
@@ -212,13 +279,14 @@ def parse_workflow_status(yaml_data: dict, project_path: Path = None) -> dict:
             is_flat_structure = True
 
     track_mode = "quick" if "quick" in selected_track.lower() else "standard"
+    outputs = collect_workflow_outputs(project_path) if project_path else {}
 
     if is_flat_structure:
         # 扁平结构: 按 phase 分组
-        phases = _parse_flat_workflow_status(workflow_status, track_mode, project_path)
+        phases = _parse_flat_workflow_status(workflow_status, track_mode, outputs)
     else:
         # 嵌套结构: 原有逻辑
-        phases = _parse_nested_workflow_status(workflow_status, project_path)
+        phases = _parse_nested_workflow_status(workflow_status, outputs)
 
     return {
         "project": project,
@@ -228,185 +296,230 @@ def parse_workflow_status(yaml_data: dict, project_path: Path = None) -> dict:
     }
 
 
-def _parse_flat_workflow_status(workflow_status: list, track_mode: str = "standard", project_path: Path = None) -> list:
+# 扁平结构的 phase 名称
+# quick-flow 模式: 没有 Solutioning 阶段
+_QUICK_PHASE_NAMES = {
+    0: "Discovery",
+    1: "Planning",
+    2: "Implementation"
+}
+# standard 模式: 完整的四个阶段
+_STANDARD_PHASE_NAMES = {
+    0: "Discovery",
+    1: "Planning",
+    2: "Solutioning",
+    3: "Implementation"
+}
+
+
+def _build_workflow_obj(wf: dict, outputs: dict[str, str] | None, counts: list[int],
+                        use_name_field: bool = False) -> dict:
+    """构建前端使用的 workflow 对象，同时累加所在阶段的计数
+
+    Args:
+        wf: YAML 中的工作流条目
+        outputs: 已存在的工作流输出文件（见 collect_workflow_outputs），用于文件检测
+        counts: 所在阶段的 [已完成数, 必需工作流数, 进行中数, 阻塞数]，原地累加
+        use_name_field: 没有 command 时是否先使用 name 字段（扁平结构）再使用 id
+    """
+    wf_id = wf.get("id", "")
+    wf_status_raw = wf.get("status", "required")
+    if not isinstance(wf_status_raw, str):
+        wf_status = map_workflow_status(wf_status_raw)
+    elif "/" in wf_status_raw or wf_status_raw.endswith((".md", ".yaml")):
+        # 状态值已是输出文件路径，直接视为已完成（与 map_workflow_status 结果相同）
+        wf_status = "completed"
+    else:
+        wf_status = _WORKFLOW_STATUS_MAP.get(wf_status_raw.lower(), "pending")
+
+    # 如果状态是 pending，检查文件是否已生成
+    if wf_status == "pending" and outputs:
+        detected_file = outputs.get(wf_id)
+        if detected_file:
+            wf_status = "completed"
+            wf_status_raw = detected_file
+            logger.info(f"自动检测到工作流输出文件: {wf_id} -> {detected_file}")
+
+    if "command" in wf:
+        name = wf["command"]
+    else:
+        name = wf.get("name", wf_id) if use_name_field else wf_id
+
+    workflow_obj = {
+        "id": wf_id,
+        "name": name,
+        "status": wf_status,
+        "agent": wf.get("agent", ""),
+    }
+
+    if wf_status == "completed" and "/" in wf_status_raw:
+        workflow_obj["outputPath"] = wf_status_raw
+
+    if wf_status not in _NON_BLOCKING_STATUSES:
+        counts[1] += 1
+        if wf_status == "completed":
+            counts[0] += 1
+        elif wf_status == "in_progress":
+            counts[2] += 1
+        elif wf_status == "blocked":
+            counts[3] += 1
+
+    return workflow_obj
+
+
+def _build_phase(phase_id, phase_name: str, workflows: list, counts: list[int]) -> dict:
+    """构建前端使用的 phase 对象，阶段状态直接由 _build_workflow_obj 累加的计数得出"""
+    completed, total, in_progress, blocked = counts
+    if in_progress:
+        status = "in_progress"
+    elif blocked:
+        status = "blocked"
+    elif completed == total:
+        # 没有必需工作流或必需工作流全部完成
+        status = "completed"
+    else:
+        status = "pending"
+    return {
+        "id": phase_id,
+        "name": phase_name,
+        "status": status,
+        "completedCount": counts[0],
+        "totalCount": counts[1],
+        "workflows": workflows
+    }
+
+
+def _parse_flat_workflow_status(workflow_status: list, track_mode: str = "standard",
+                                outputs: dict[str, str] | None = None) -> list:
     """解析扁平结构的工作流状态 (每个 workflow 是单独条目)
 
     Args:
         workflow_status: 工作流状态列表
         track_mode: 轨道模式 ("standard" 或 "quick")
-        project_path: 项目根目录路径，用于文件检测
+        outputs: 已存在的工作流输出文件（见 collect_workflow_outputs），用于文件检测
     """
-    # 按 phase 分组
+    # 按 phase 分组: phase_id -> (workflows, [已完成数, 必需工作流数])
     phases_dict = {}
 
-    # 根据 track_mode 确定 phase 名称
-    if track_mode == "quick":
-        # quick-flow 模式: 没有 Solutioning 阶段
-        phase_names = {
-            0: "Discovery",
-            1: "Planning",
-            2: "Implementation"
-        }
-    else:
-        # standard 模式: 完整的四个阶段
-        phase_names = {
-            0: "Discovery",
-            1: "Planning",
-            2: "Solutioning",
-            3: "Implementation"
-        }
-
     for wf in workflow_status:
         phase_id = wf.get("phase", 0)
-        wf_id = wf.get("id", "")
-        wf_status_raw = wf.get("status", "required")
-        wf_status = map_workflow_status(wf_status_raw)
+        phase = phases_dict.get(phase_id)
+        if phase is None:
+            phase = phases_dict[phase_id] = ([], [0, 0, 0, 0])
+        workflows, counts = phase
+        workflows.append(_build_workflow_obj(wf, outputs, counts, use_name_field=True))
 
-        # 如果状态是 pending 且项目路径存在，检查文件是否已生成
-        if wf_status == "pending" and project_path:
-            detected_file = check_workflow_file_exists(project_path, wf_id)
-            if detected_file:
-                wf_status = "completed"
-                wf_status_raw = detected_file
-                logger.info(f"自动检测到工作流输出文件: {wf_id} -> {detected_file}")
-
-        workflow_obj = {
-            "id": wf_id,
-            "name": wf.get("command", wf.get("name", wf_id)),
-            "status": wf_status,
-            "agent": wf.get("agent", ""),
-        }
-
-        if wf_status == "completed" and "/" in wf_status_raw:
-            workflow_obj["outputPath"] = wf_status_raw
-
-        if phase_id not in phases_dict:
-            phases_dict[phase_id] = {
-                "id": phase_id,
-                "name": phase_names.get(phase_id, f"Phase {phase_id}"),
-                "workflows": []
-            }
-
-        phases_dict[phase_id]["workflows"].append(workflow_obj)
-
-    # 计算每个阶段的状态和计数
-    phases = []
-    for phase_id in sorted(phases_dict.keys()):
-        phase_data = phases_dict[phase_id]
-        workflows = phase_data["workflows"]
-
-        completed_count = 0
-        total_count = 0
-        non_blocking = {"skipped", "optional", "recommended", "conditional"}
-
-        for wf in workflows:
-            if wf["status"] not in non_blocking:
-                total_count += 1
-                if wf["status"] == "completed":
-                    completed_count += 1
-
-        phase_status = calculate_phase_status(workflows)
-
-        phases.append({
-            "id": phase_id,
-            "name": phase_data["name"],
-            "status": phase_status,
-            "completedCount": completed_count,
-            "totalCount": total_count,
-            "workflows": workflows
-        })
+    # 根据 track_mode 确定 phase 名称
+    phase_names = _QUICK_PHASE_NAMES if track_mode == "quick" else _STANDARD_PHASE_NAMES
 
-    return phases
+    return [
+        _build_phase(phase_id, phase_names.get(phase_id, f"Phase {phase_id}"), *phases_dict[phase_id])
+        for phase_id in sorted(phases_dict.keys())
+    ]
 
 
-def _parse_nested_workflow_status(workflow_status: list, project_path: Path = None) -> list:
+def _parse_nested_workflow_status(workflow_status: list, outputs: dict[str, str] | None = None) -> list:
     """解析嵌套结构的工作流状态 (每个 phase 包含 workflows 数组)
     
     Args:
         workflow_status: 工作流状态列表
-        project_path: 项目根目录路径，用于文件检测
+        outputs: 已存在的工作流输出文件（见 collect_workflow_outputs），用于文件检测
     """
     phases = []
 
     for phase_data in workflow_status:
         phase_id = phase_data.get("phase", 0)
         phase_name = phase_data.get("name", f"Phase {phase_id}")
-        workflows_raw = phase_data.get("workflows", [])
-
-        workflows = []
-        completed_count = 0
-        total_count = 0
-
-        for wf in workflows_raw:
-            wf_id = wf.get("id", "")
-            wf_status_raw = wf.get("status", "required")
-            wf_status = map_workflow_status(wf_status_raw)
-
-            # 如果状态是 pending 且项目路径存在，检查文件是否已生成
-            if wf_status == "pending" and project_path:
-                detected_file = check_workflow_file_exists(project_path, wf_id)
-                if detected_file:
-                    wf_status = "completed"
-                    wf_status_raw = detected_file
-                    logger.info(f"自动检测到工作流输出文件: {wf_id} -> {detected_file}")
-
-            workflow_obj = {
-                "id": wf_id,
-                "name": wf.get("command", wf_id),
-                "status": wf_status,
-                "agent": wf.get("agent", ""),
-            }
-
-            if wf_status == "completed" and "/" in wf_status_raw:
-                workflow_obj["outputPath"] = wf_status_raw
-
-            workflows.append(workflow_obj)
-
-            non_blocking = {"skipped", "optional", "recommended", "conditional"}
-            if wf_status not in non_blocking:
-                total_count += 1
-                if wf_status == "completed":
-                    completed_count += 1
-
-        phase_status = calculate_phase_status(workflows)
-
-        phases.append({
-            "id": phase_id,
-            "name": phase_name,
-            "status": phase_status,
-            "completedCount": completed_count,
-            "totalCount": total_count,
-            "workflows": workflows
-        })
+
+        counts = [0, 0, 0, 0]
+        workflows = [
+            _build_workflow_obj(wf, outputs, counts)
+            for wf in phase_data.get("workflows", [])
+        ]
+        phases.append(_build_phase(phase_id, phase_name, workflows, counts))
 
     return phases
 
 
-def _get_story_file_status(project_path: Path, story_location: str, story_id: str) -> str | None:
-    """从 story 文件中读取 Status 字段"""
-    import re
+# Story 文件中的状态字段: **Status:** xxx 或 Status: xxx
+_STORY_STATUS_RE = re.compile(r'\*?\*?Status:?\*?\*?\s*(\S+)', re.IGNORECASE)
+# 更新状态时替换的 Status: xxx（在行首或前面有空格）
+_STORY_STATUS_SUB_RE = re.compile(r'(Status:\s*)(\S+)')
+
+
+# Status 字段通常在 Story 文件开头，先只读取这么多字节查找
+_STORY_STATUS_HEAD_BYTES = 2048
+
+
+def _read_story_file_status(file: Path) -> str | None:
+    """读取 Story 文件中的 Status 值
+
+    先在文件开头查找；开头没有找到或匹配到达读取边界（值可能被截断）时再读取整个文件。
+    """
+    with open(file, 'rb') as f:
+        head = f.read(_STORY_STATUS_HEAD_BYTES)
+        text = head.decode('utf-8', errors='ignore')
+        match = _STORY_STATUS_RE.search(text)
+        if len(head) == _STORY_STATUS_HEAD_BYTES and (match is None or match.end() == len(text)):
+            text = (head + f.read()).decode('utf-8')
+            match = _STORY_STATUS_RE.search(text)
+    return match.group(1).lower() if match else None
+
+
+def _find_story_dir(project_path: Path, story_location: str) -> tuple[Path, tuple[tuple[str, ...], frozenset[str]]] | None:
+    """定位 Story 文件目录，返回 (目录, 目录列表)，找不到时返回 None"""
     # story_location 可能是 "md/sprint_artifacts" 或 "md/sprint-artifacts"
     story_dir = project_path / story_location.replace("\\", "/")
-    if not story_dir.exists():
+    entries = _dir_entries(story_dir)
+    if entries is None:
         # 尝试替换下划线/连字符
         alt_location = story_location.replace("_", "-") if "_" in story_location else story_location.replace("-", "_")
         story_dir = project_path / alt_location
-        if not story_dir.exists():
+        entries = _dir_entries(story_dir)
+        if entries is None:
             return None
+    return story_dir, entries
 
-    # 查找以 story_id 开头的 .md 文件
-    for file in story_dir.glob(f"{story_id}-*.md"):
+
+def _index_story_files(story_dir: Path, entries: tuple[tuple[str, ...], frozenset[str]]) -> dict[str, list[Path]]:
+    """按 "{epic}-{story}" 前缀为目录中的 .md 文件建立索引
+
+    索引中 story_id 对应的文件与 glob(f"{story_id}-*.md") 的结果相同，顺序也相同。
+    """
+    suffix = os.path.normcase(".md")
+    index = {}
+    for name in entries[0]:
+        normalized = os.path.normcase(name)
+        if not normalized.endswith(suffix):
+            continue
+        parts = normalized.split("-", 2)
+        if len(parts) == 3:
+            index.setdefault(f"{parts[0]}-{parts[1]}", []).append(story_dir / name)
+    return index
+
+
+def _get_story_file_status(story_files: list[Path]) -> str | None:
+    """从 story 文件中读取 Status 字段（依次尝试，返回第一个读到的状态）"""
+    for file in story_files:
         try:
-            content = file.read_text(encoding='utf-8')
-            # 匹配 **Status:** xxx 或 Status: xxx
-            match = re.search(r'\*?\*?Status:?\*?\*?\s*(\S+)', content, re.IGNORECASE)
-            if match:
-                return match.group(1).lower()
+            status = _read_story_file_status(file)
+            if status:
+                return status
         except Exception:
             pass
     return None
 
 
+# development_status 的 key：epic-{编号}、[epic-]{编号}-retrospective
+# 或 {epic 编号}-{story 编号}[-{名称}]（以 -retrospective 结尾的不算 Story）
+_SPRINT_KEY_RE = re.compile(
+    r'epic-(\d+)\Z'
+    r'|(?:epic-)?(\d+)-retrospective\Z'
+    r'|(?!.*-retrospective\Z)(\d+)-(\d+)(?:-(.*))?\Z',
+    re.DOTALL
+)
+
+
 def parse_sprint_status(yaml_data: dict, project_path: Path = None) -> dict:
     """解析 sprint-status.yaml 并转换为前端友好的 JSON 结构
 
@@ -434,51 +547,59 @@ def parse_sprint_status(yaml_data: dict, project_path: Path = None) -> dict:
             "message": "Sprint 文件已创建，等待生成 Epic 和 Story"
         }
 
-    epics_dict = {}
+    # 只列出一次 Story 目录，各 Story 从索引中查找自己的文件
+    story_index = {}
+    if project_path:
+        story_dir = _find_story_dir(project_path, story_location)
+        if story_dir:
+            story_index = _index_story_files(*story_dir)
 
-    for key, status in dev_status.items():
-        if key.startswith("epic-") and key.count("-") == 1:
-            epic_num = key.split("-")[1]
-            if epic_num.isdigit():
-                epics_dict[int(epic_num)] = {
-                    "id": key,
-                    "number": int(epic_num),
-                    "name": f"Epic {epic_num}",
-                    "status": status,
-                    "stories": [],
-                    "retrospective": None
-                }
+    # 只遍历一次：Epic 可能出现在其 Story 之后，Story 和回顾先按 Epic 编号暂存，
+    # 遍历结束后再挂到存在的 Epic 上
+    epics_dict = {}
+    stories = defaultdict(list)
+    retros = {}
 
     for key, status in dev_status.items():
-        if key.endswith("-retrospective"):
-            epic_num_str = key.replace("epic-", "").replace("-retrospective", "")
-            if epic_num_str.isdigit():
-                epic_num = int(epic_num_str)
-                if epic_num in epics_dict:
-                    epics_dict[epic_num]["retrospective"] = status
-
-        elif not key.startswith("epic-"):
-            parts = key.split("-")
-            if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
-                epic_num = int(parts[0])
-                story_num = parts[1]
-                story_name = "-".join(parts[2:]).replace("-", " ").title() if len(parts) > 2 else key
-                story_id = f"{epic_num}-{story_num}"
-
-                # 尝试从 story 文件读取真实状态
-                real_status = status
-                if project_path:
-                    real_status = _get_story_file_status(project_path, story_location, story_id) or status
-
-                if epic_num in epics_dict:
-                    epics_dict[epic_num]["stories"].append({
-                        "id": key,
-                        "storyId": story_id,
-                        "name": story_name,
-                        "status": real_status
-                    })
-
-    epics = [epics_dict[num] for num in sorted(epics_dict.keys())]
+        m = _SPRINT_KEY_RE.match(key)
+        if m is None:
+            continue
+        epic_num, retro_num, story_epic, story_num, slug = m.groups()
+        if epic_num is not None:
+            epics_dict[int(epic_num)] = (key, epic_num, status)
+        elif retro_num is not None:
+            retros[int(retro_num)] = status
+        else:
+            stories[int(story_epic)].append((key, story_num, slug, status))
+
+    epics = []
+    for num in sorted(epics_dict):
+        key, epic_num, status = epics_dict[num]
+        epic_stories = []
+        for story_key, story_num, slug, story_status in stories.get(num, ()):
+            story_name = slug.replace("-", " ").title() if slug is not None else story_key
+            story_id = f"{num}-{story_num}"
+
+            # 尝试从 story 文件读取真实状态（没有对应 Epic 的 Story 不会显示，无需读取）
+            story_files = story_index.get(os.path.normcase(story_id))
+            if story_files:
+                story_status = _get_story_file_status(story_files) or story_status
+
+            epic_stories.append({
+                "id": story_key,
+                "storyId": story_id,
+                "name": story_name,
+                "status": story_status
+            })
+
+        epics.append({
+            "id": key,
+            "number": num,
+            "name": f"Epic {epic_num}",
+            "status": status,
+            "stories": epic_stories,
+            "retrospective": retros.get(num)
+        })
 
     return {
         "project": project,
@@ -501,8 +622,8 @@ async def workflow_status_handler(request: web.Request) -> web.Response:
         return error_response("FILE_NOT_FOUND", "工作流状态文件不存在")
 
     try:
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        # 文件未变化时复用已解析的数据（只读，不能原地修改）
+        yaml_data = await load_yaml_cached_async(yaml_file, WORKFLOW_STATUS_KEYS)
     except yaml.YAMLError as e:
         logger.error(f"YAML 解析失败: {e}")
         return error_response("PARSE_ERROR", f"工作流状态文件解析失败: {str(e)}")
@@ -511,7 +632,8 @@ async def workflow_status_handler(request: web.Request) -> web.Response:
         return error_response("FILE_NOT_FOUND", f"无法读取工作流状态文件: {str(e)}")
 
     try:
-        result = parse_workflow_status(yaml_data, project_path)
+        # 解析过程会检查输出文件是否存在，放到线程中执行
+        result = await asyncio.to_thread(parse_workflow_status, yaml_data, project_path)
     except Exception as e:
         logger.error(f"数据转换失败: {e}")
         return error_response("PARSE_ERROR", f"数据转换失败: {str(e)}")
@@ -534,8 +656,8 @@ async def sprint_status_handler(request: web.Request) -> web.Response:
         return error_response("FILE_NOT_FOUND", "Sprint 状态文件不存在")
 
     try:
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        # 文件未变化时复用已解析的数据（只读，不能原地修改）
+        yaml_data = await load_yaml_cached_async(yaml_file)
     except yaml.YAMLError as e:
         logger.error(f"YAML 解析失败: {e}")
         return error_response("PARSE_ERROR", f"Sprint 状态文件解析失败: {str(e)}")
@@ -544,7 +666,8 @@ async def sprint_status_handler(request: web.Request) -> web.Response:
         return error_response("FILE_NOT_FOUND", f"无法读取 Sprint 状态文件: {str(e)}")
 
     try:
-        result = parse_sprint_status(yaml_data, project_path)
+        # 解析过程会读取各 Story 文件，放到线程中执行
+        result = await asyncio.to_thread(parse_sprint_status, yaml_data, project_path)
     except Exception as e:
         logger.error(f"数据转换失败: {e}")
         return error_response("PARSE_ERROR", f"数据转换失败: {str(e)}")
@@ -552,44 +675,63 @@ async def sprint_status_handler(request: web.Request) -> web.Response:
     return success_response(result)
 
 
+# 手动更新 Story 状态时允许的状态值
+_VALID_STATUSES = frozenset(("backlog", "drafted", "ready-for-dev", "in-progress", "review", "done"))
+# 需要同步更新故事文件中 Status 字段的状态值
+_FILE_UPDATE_STATUSES = frozenset(("ready-for-dev", "in-progress", "review", "done"))
+
+
 def find_story_file(project_path: Path, story_id: str) -> Path | None:
     """查找故事文件，story_id 格式为 '7-1'"""
     sprint_artifacts_dir = project_path / "md" / "sprint-artifacts"
-    if not sprint_artifacts_dir.exists():
+    entries = _dir_entries(sprint_artifacts_dir)
+    if entries is None:
         return None
 
     # 查找以 story_id 开头的 .md 文件
-    for file in sprint_artifacts_dir.glob(f"{story_id}-*.md"):
-        return file
+    story_file = _find_first_story_file(sprint_artifacts_dir, entries, story_id)
+    if story_file is not None:
+        return story_file
 
     # 也尝试直接匹配 story_id.md
-    direct_file = sprint_artifacts_dir / f"{story_id}.md"
-    if direct_file.exists():
-        return direct_file
+    if os.path.normcase(f"{story_id}.md") in entries[1]:
+        return sprint_artifacts_dir / f"{story_id}.md"
 
     return None
 
 
 def update_story_file_status(file_path: Path, new_status: str) -> bool:
-    """更新故事文件中的 Status 字段"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    """更新故事文件中的 Status 字段
 
-        # 查找并替换 Status 字段
-        import re
-        # 匹配 Status: xxx 格式（在行首或前面有空格）
-        pattern = r'(Status:\s*)(\S+)'
+    新旧状态值的 UTF-8 字节数相同时（如 review -> drafted）只覆盖状态值所在的字节，
+    不重写整个文件；否则替换后整体写回。按字节读写，保留文件原有的换行符。
+    """
+    try:
+        content = file_path.read_bytes().decode('utf-8')
 
-        if re.search(pattern, content):
-            new_content = re.sub(pattern, f'\\1{new_status}', content)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            logger.info(f"故事文件状态已更新: {file_path} -> {new_status}")
-            return True
-        else:
+        # 查找 Status 字段
+        matches = list(_STORY_STATUS_SUB_RE.finditer(content))
+        if not matches:
             logger.warning(f"故事文件中未找到 Status 字段: {file_path}")
             return False
+
+        new_bytes = new_status.encode('utf-8')
+        if all(len(m[2].encode('utf-8')) == len(new_bytes) for m in matches):
+            with open(file_path, 'r+b') as f:
+                offset = 0
+                last = 0
+                for m in matches:
+                    offset += len(content[last:m.start(2)].encode('utf-8'))
+                    last = m.start(2)
+                    if m[2] != new_status:
+                        f.seek(offset)
+                        f.write(new_bytes)
+        else:
+            new_content = _STORY_STATUS_SUB_RE.sub(f'\\1{new_status}', content)
+            with open(file_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(new_content)
+        logger.info(f"故事文件状态已更新: {file_path} -> {new_status}")
+        return True
     except Exception as e:
         logger.error(f"更新故事文件失败: {e}")
         return False
@@ -608,6 +750,22 @@ def delete_story_file(file_path: Path) -> bool:
         return False
 
 
+def _sync_story_file(project_path: Path, story_id: str, new_status: str) -> tuple[Path | None, bool, bool]:
+    """按新状态处理故事文件：待办状态删除文件，其他状态更新文件中的 Status 字段
+
+    Returns:
+        (故事文件路径, 是否已更新, 是否已删除)
+    """
+    story_file = find_story_file(project_path, story_id)
+    if not story_file:
+        return None, False, False
+    if new_status == "backlog":
+        return story_file, False, delete_story_file(story_file)
+    if new_status in _FILE_UPDATE_STATUSES:
+        return story_file, update_story_file_status(story_file, new_status), False
+    return story_file, False, False
+
+
 async def update_story_status_handler(request: web.Request) -> web.Response:
     """处理 POST /api/story/update-status 请求 - 手动更新 Story 状态"""
     try:
@@ -622,8 +780,7 @@ async def update_story_status_handler(request: web.Request) -> web.Response:
         return error_response("INVALID_REQUEST", "缺少 storyId 或 status 参数")
 
     # 验证状态值
-    valid_statuses = ["backlog", "drafted", "ready-for-dev", "in-progress", "review", "done"]
-    if new_status not in valid_statuses:
+    if not isinstance(new_status, str) or new_status not in _VALID_STATUSES:
         return error_response("INVALID_REQUEST", f"无效的状态值: {new_status}")
 
     projects = await load_recent_projects()
@@ -639,8 +796,8 @@ async def update_story_status_handler(request: web.Request) -> web.Response:
         return error_response("FILE_NOT_FOUND", "Sprint 状态文件不存在")
 
     try:
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        # 需要修改后写回，读取独立的副本而不是共享的缓存
+        yaml_data = await asyncio.to_thread(load_yaml_file, yaml_file)
     except Exception as e:
         logger.error(f"读取 Sprint 状态文件失败: {e}")
         return error_response("FILE_NOT_FOUND", f"无法读取 Sprint 状态文件: {str(e)}")
@@ -650,37 +807,22 @@ async def update_story_status_handler(request: web.Request) -> web.Response:
 
     # story_id 格式为 "6-1"，需要查找匹配的 key
     # YAML 中的 key 格式为 "6-1-story-name" 或类似
-    found = False
-    found_key = None
-    for key in dev_status.keys():
-        if key.startswith(story_id + "-") or key == story_id:
-            dev_status[key] = new_status
-            found = True
-            found_key = key
-            logger.info(f"更新 Story 状态: {key} -> {new_status}")
-            break
-
-    if not found:
+    prefix = story_id + "-"
+    found_key = next((key for key in dev_status if key == story_id or key.startswith(prefix)), None)
+    if found_key is None:
         return error_response("NOT_FOUND", f"未找到 Story: {story_id}")
 
-    # 处理故事文件
-    story_file = find_story_file(project_path, story_id)
-    story_file_updated = False
-    story_file_deleted = False
+    dev_status[found_key] = new_status
+    logger.info(f"更新 Story 状态: {found_key} -> {new_status}")
 
-    if new_status == "backlog":
-        # 待办状态：删除故事文件
-        if story_file:
-            story_file_deleted = delete_story_file(story_file)
-    elif new_status in ["ready-for-dev", "in-progress", "review", "done"]:
-        # 其他状态：更新故事文件中的 Status 字段
-        if story_file:
-            story_file_updated = update_story_file_status(story_file, new_status)
+    # 处理故事文件
+    story_file, story_file_updated, story_file_deleted = await asyncio.to_thread(
+        _sync_story_file, project_path, story_id, new_status
+    )
 
     # 保存 YAML 文件
     try:
-        with open(yaml_file, 'w', encoding='utf-8') as f:
-            yaml.dump(yaml_data, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
+        await asyncio.to_thread(save_yaml_file, yaml_file, yaml_data)
         logger.info(f"Sprint 状态文件已更新: {yaml_file}")
     except Exception as e:
         logger.error(f"保存 Sprint 状态文件失败: {e}")
@@ -703,6 +845,34 @@ async def update_story_status_handler(request: web.Request) -> web.Response:
     })
 
 
+# 工作流状态文件 -> (st_mtime_ns, st_size, track_mode)
+_track_mode_cache: dict[Path, tuple[int, int, str]] = {}
+
+
+async def _get_track_mode(project_path: Path) -> str:
+    """获取项目的轨道模式（"quick" 或 "standard"），无法读取工作流状态文件时为 "quick"
+
+    文件 mtime 和大小未变化时直接返回上次的结果，只需一次 stat。
+    """
+    yaml_file = find_workflow_status_file(project_path)
+    if not yaml_file:
+        return "quick"
+    try:
+        st = yaml_file.stat()
+        cached = _track_mode_cache.get(yaml_file)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        yaml_data = await load_yaml_cached_async(yaml_file, WORKFLOW_STATUS_KEYS)
+        track_mode = "quick"
+        if yaml_data:
+            selected_track = yaml_data.get("selected_track", "")
+            track_mode = "quick" if "quick" in selected_track.lower() else "standard"
+    except Exception:
+        return "quick"
+    _track_mode_cache[yaml_file] = (st.st_mtime_ns, st.st_size, track_mode)
+    return track_mode
+
+
 async def implementation_flow_handler(request: web.Request) -> web.Response:
     """处理 GET /api/implementation-flow 请求 - 返回 Implementation 阶段流程状态"""
     projects = await load_recent_projects()
@@ -713,21 +883,6 @@ async def implementation_flow_handler(request: web.Request) -> web.Response:
     if not project_path.exists():
         return error_response("FILE_NOT_FOUND", "项目路径不存在")
 
-    # 获取 track_mode
-    track_mode = "quick"
-    yaml_file = find_workflow_status_file(project_path)
-    if yaml_file:
-        try:
-            with open(yaml_file, 'r', encoding='utf-8') as f:
-                yaml_data = yaml.safe_load(f)
-            if yaml_data:
-                selected_track = yaml_data.get("selected_track", "")
-                if "quick" in selected_track.lower():
-                    track_mode = "quick"
-                else:
-                    track_mode = "standard"
-        except Exception:
-            pass
-
-    result = get_implementation_flow_status(project_path, track_mode)
+    track_mode = await _get_track_mode(project_path)
+    result = await asyncio.to_thread(get_implementation_flow_status, project_path, track_mode)
     return success_response(result)
@@ -4,6 +4,7 @@ BMAD GUI - Keyboard Sender
 """
 
 import asyncio
+import functools
 import logging
 import sys
 import time
@@ -36,6 +37,7 @@ if sys.platform == "win32":
         import win32gui
         import win32con
         import win32api
+        import win32clipboard
         WIN32_AVAILABLE = True
     except ImportError:
         WIN32_AVAILABLE = False
@@ -43,6 +45,129 @@ if sys.platform == "win32":
 else:
     WIN32_AVAILABLE = False
 
+if WIN32_AVAILABLE:
+    import ctypes
+    from ctypes import wintypes
+
+    VK_RETURN = 0x0D
+    VK_CONTROL = 0x11
+    VK_MENU = 0x12
+    VK_ESCAPE = 0x1B
+    KEYEVENTF_KEYUP = 0x0002
+    INPUT_KEYBOARD = 1
+
+    class KEYBDINPUT(ctypes.Structure):
+        _fields_ = [
+            ("wVk", wintypes.WORD),
+            ("wScan", wintypes.WORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t),
+        ]
+
+    class MOUSEINPUT(ctypes.Structure):
+        _fields_ = [
+            ("dx", wintypes.LONG),
+            ("dy", wintypes.LONG),
+            ("mouseData", wintypes.DWORD),
+            ("dwFlags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.c_size_t),
+        ]
+
+    class _INPUTUNION(ctypes.Union):
+        # 包含 MOUSEINPUT（最大的成员）使 sizeof(INPUT) 与系统定义一致
+        _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+    class INPUT(ctypes.Structure):
+        _anonymous_ = ("u",)
+        _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+    # 独立的 DLL 实例：argtypes/restype 只在模块加载时设置一次，也不影响其他模块
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _user32 = ctypes.WinDLL("user32", use_last_error=True)
+
+    _kernel32.GetCurrentThreadId.argtypes = []
+    _kernel32.GetCurrentThreadId.restype = wintypes.DWORD
+    _user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+    _user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+    _user32.AttachThreadInput.argtypes = [wintypes.DWORD, wintypes.DWORD, wintypes.BOOL]
+    _user32.AttachThreadInput.restype = wintypes.BOOL
+    _user32.keybd_event.argtypes = [wintypes.BYTE, wintypes.BYTE, wintypes.DWORD, ctypes.c_size_t]
+    _user32.keybd_event.restype = None
+    _user32.SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int]
+    _user32.SendInput.restype = wintypes.UINT
+
+    def _key_inputs(*vks: int):
+        """构造依次按下 vks、再逆序释放的 INPUT 数组"""
+        events = [(vk, 0) for vk in vks] + [(vk, KEYEVENTF_KEYUP) for vk in reversed(vks)]
+        inputs = (INPUT * len(events))()
+        for item, (vk, flags) in zip(inputs, events):
+            item.type = INPUT_KEYBOARD
+            item.ki = KEYBDINPUT(wVk=vk, dwFlags=flags)
+        return inputs
+
+    # 按键名（与 pyautogui 相同）-> 预先构造的 INPUT 数组
+    _KEY_INPUTS = {
+        ("enter",): _key_inputs(VK_RETURN),
+        ("escape",): _key_inputs(VK_ESCAPE),
+        ("ctrl", "v"): _key_inputs(VK_CONTROL, ord("V")),
+        ("ctrl", "c"): _key_inputs(VK_CONTROL, ord("C")),
+    }
+
+# 终端窗口标题中的关键字（小写）
+_TERMINAL_TITLE_TERMS = ('claude', 'cmd', 'powershell', 'terminal')
+
+# 找到的窗口在该时长（秒）内直接复用，连续发送多个按键时不必每次枚举所有窗口
+WINDOW_CACHE_TTL = 2.0
+
+
+def _window_handle(window) -> int:
+    """获取 pygetwindow 窗口对象的句柄，取不到时按标题查找"""
+    hwnd = getattr(window, "_hWnd", None)
+    if hwnd:
+        return hwnd
+    return win32gui.FindWindow(None, window.title)
+
+
+@functools.lru_cache(maxsize=8)
+def _project_title_terms(project_path: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """项目路径 -> (小写的项目目录名, 小写的项目路径)，用于匹配窗口标题"""
+    if not project_path:
+        return None, None
+    return Path(project_path).name.lower(), project_path.lower()
+
+
+def _press_keys(*keys: str) -> None:
+    """按下并释放按键（多个键时为组合键）
+
+    Windows 上用预先构造的 INPUT 数组直接调用 SendInput，省去 pyautogui 的按键名解析和动作间隔；
+    其他平台或 SendInput 被拦截时使用 pyautogui。
+    """
+    if WIN32_AVAILABLE:
+        inputs = _KEY_INPUTS[keys]
+        if _user32.SendInput(len(inputs), inputs, ctypes.sizeof(INPUT)):
+            return
+        logger.warning(f"SendInput 失败（错误码 {ctypes.get_last_error()}），改用 pyautogui")
+    pyautogui.hotkey(*keys)
+
+
+def _replace_clipboard_text(text: str) -> Optional[str]:
+    """将剪贴板内容替换为 text，返回原有的文本（没有文本时为 None）
+
+    只读取 CF_UNICODETEXT，剪贴板中是图片等大块内容时也不会做格式转换。
+    """
+    win32clipboard.OpenClipboard()
+    try:
+        previous = None
+        if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_UNICODETEXT):
+            previous = win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
+        win32clipboard.EmptyClipboard()
+        win32clipboard.SetClipboardText(text, win32clipboard.CF_UNICODETEXT)
+    finally:
+        win32clipboard.CloseClipboard()
+    return previous
+
 
 class KeyboardSender:
     """键盘模拟发送器"""
@@ -50,6 +175,8 @@ class KeyboardSender:
     def __init__(self):
         self.last_window_handle = None
         self.last_window_title = None
+        # 项目路径 -> (查找时间 time.monotonic(), 窗口对象, 窗口标题)
+        self._window_cache: dict[Optional[str], Tuple[float, any, str]] = {}
 
     def is_available(self) -> bool:
         """检查键盘模拟功能是否可用"""
@@ -68,33 +195,54 @@ class KeyboardSender:
         if not PYGETWINDOW_AVAILABLE:
             return None
 
-        project_name = Path(project_path).name.lower() if project_path else None
+        cached = self._window_cache.get(project_path)
+        if cached and time.monotonic() - cached[0] < WINDOW_CACHE_TTL:
+            window = cached[1]
+            if not WIN32_AVAILABLE or win32gui.IsWindow(_window_handle(window)):
+                return (window, cached[2])
+
+        result = self._search_claude_window(project_path)
+        if result:
+            self._window_cache[project_path] = (time.monotonic(), *result)
+        else:
+            self._window_cache.pop(project_path, None)
+        return result
+
+    def _search_claude_window(self, project_path: str = None) -> Optional[Tuple[any, str]]:
+        """枚举所有窗口查找 Claude Code 窗口（见 find_claude_window）"""
+        project_name, project_path_lower = _project_title_terms(project_path)
 
         try:
             all_windows = gw.getAllWindows()
 
-            # 优先查找标题包含项目名和 claude 的窗口
+            # 一次遍历按优先级匹配：标题包含项目名的终端窗口（找到即返回）>
+            # 包含 claude 的窗口 > 包含项目路径的窗口，同一优先级取第一个
+            fallback = None
+            fallback_rank = 0
             for win in all_windows:
-                title_lower = win.title.lower()
+                title = win.title
+                # 无标题的窗口不会匹配；不可见的窗口无法接收输入
+                if not title:
+                    continue
+                if WIN32_AVAILABLE and not win32gui.IsWindowVisible(_window_handle(win)):
+                    continue
+                title_lower = title.lower()
                 if project_name and project_name in title_lower:
                     # 检查是否是终端窗口
-                    if any(term in title_lower for term in ['claude', 'cmd', 'powershell', 'terminal', 'windows terminal']):
-                        logger.info(f"找到项目窗口: {win.title}")
-                        return (win, win.title)
-
-            # 其次查找任何包含 claude 的窗口
-            for win in all_windows:
-                title_lower = win.title.lower()
-                if 'claude' in title_lower:
-                    logger.info(f"找到 Claude 窗口: {win.title}")
-                    return (win, win.title)
-
-            # 最后查找包含项目路径的窗口
-            if project_path:
-                for win in all_windows:
-                    if project_path.lower() in win.title.lower():
-                        logger.info(f"找到路径匹配窗口: {win.title}")
-                        return (win, win.title)
+                    if any(term in title_lower for term in _TERMINAL_TITLE_TERMS):
+                        logger.info(f"找到项目窗口: {title}")
+                        return (win, title)
+                if fallback_rank < 2 and 'claude' in title_lower:
+                    fallback, fallback_rank = (win, title), 2
+                elif fallback_rank < 1 and project_path_lower and project_path_lower in title_lower:
+                    fallback, fallback_rank = (win, title), 1
+
+            if fallback_rank == 2:
+                logger.info(f"找到 Claude 窗口: {fallback[1]}")
+                return fallback
+            if fallback_rank == 1:
+                logger.info(f"找到路径匹配窗口: {fallback[1]}")
+                return fallback
 
             logger.warning("未找到 Claude 窗口")
             return None
@@ -103,9 +251,9 @@ class KeyboardSender:
             logger.error(f"查找窗口失败: {e}")
             return None
 
-    def activate_window(self, window) -> bool:
+    async def activate_window(self, window) -> bool:
         """
-        激活指定窗口
+        激活指定窗口（等待使用 asyncio.sleep，不阻塞事件循环）
 
         Args:
             window: pygetwindow 窗口对象
@@ -114,60 +262,53 @@ class KeyboardSender:
             是否成功激活
         """
         try:
+            # 窗口已在前台时无需重新激活
+            if WIN32_AVAILABLE and not window.isMinimized:
+                if win32gui.GetForegroundWindow() == _window_handle(window):
+                    return True
+
             # 如果窗口最小化，先恢复
             if window.isMinimized:
                 window.restore()
-                time.sleep(0.1)
+                await asyncio.sleep(0.1)
 
             # Windows 强制激活方案
             if WIN32_AVAILABLE:
                 try:
-                    import ctypes
-                    from ctypes import wintypes
-
-                    hwnd = win32gui.FindWindow(None, window.title)
+                    hwnd = _window_handle(window)
                     if hwnd:
                         # 获取当前前台窗口的线程ID
                         foreground_hwnd = win32gui.GetForegroundWindow()
-                        foreground_thread_id = ctypes.windll.user32.GetWindowThreadProcessId(
-                            foreground_hwnd, None
-                        )
+                        foreground_thread_id = _user32.GetWindowThreadProcessId(foreground_hwnd, None)
                         # 获取目标窗口的线程ID
-                        target_thread_id = ctypes.windll.user32.GetWindowThreadProcessId(
-                            hwnd, None
-                        )
+                        target_thread_id = _user32.GetWindowThreadProcessId(hwnd, None)
                         # 获取当前线程ID
-                        current_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+                        current_thread_id = _kernel32.GetCurrentThreadId()
 
                         # 附加线程输入
-                        if foreground_thread_id != current_thread_id:
-                            ctypes.windll.user32.AttachThreadInput(
-                                current_thread_id, foreground_thread_id, True
-                            )
-
-                        # 模拟 Alt 键按下（绕过前台锁定）
-                        ctypes.windll.user32.keybd_event(0x12, 0, 0, 0)  # Alt down
-                        ctypes.windll.user32.keybd_event(0x12, 0, 2, 0)  # Alt up
-
-                        # 如果最小化，恢复窗口
-                        if win32gui.IsIconic(hwnd):
-                            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                            time.sleep(0.1)
-
-                        # 设置前台窗口
-                        win32gui.SetForegroundWindow(hwnd)
-                        time.sleep(0.1)
-
-                        # 确保窗口在最前面
-                        win32gui.BringWindowToTop(hwnd)
-
-                        # 分离线程输入
-                        if foreground_thread_id != current_thread_id:
-                            ctypes.windll.user32.AttachThreadInput(
-                                current_thread_id, foreground_thread_id, False
-                            )
-
-                        time.sleep(0.2)
+                        attached = foreground_thread_id != current_thread_id
+                        if attached:
+                            _user32.AttachThreadInput(current_thread_id, foreground_thread_id, True)
+
+                        try:
+                            # 模拟 Alt 键按下（绕过前台锁定）
+                            _user32.keybd_event(VK_MENU, 0, 0, 0)
+                            _user32.keybd_event(VK_MENU, 0, KEYEVENTF_KEYUP, 0)
+
+                            # 如果最小化，恢复窗口
+                            if win32gui.IsIconic(hwnd):
+                                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+                                await asyncio.sleep(0.1)
+
+                            # 设置前台窗口并确保窗口在最前面
+                            win32gui.SetForegroundWindow(hwnd)
+                            win32gui.BringWindowToTop(hwnd)
+                        finally:
+                            # 分离线程输入（激活失败时也要分离）
+                            if attached:
+                                _user32.AttachThreadInput(current_thread_id, foreground_thread_id, False)
+
+                        await asyncio.sleep(0.2)
 
                         # 验证是否成功
                         if win32gui.GetForegroundWindow() == hwnd:
@@ -180,7 +321,7 @@ class KeyboardSender:
             # 备用方案：使用 pygetwindow
             try:
                 window.activate()
-                time.sleep(0.2)
+                await asyncio.sleep(0.2)
                 if window.isActive:
                     logger.info(f"窗口已激活 (pygetwindow): {window.title}")
                     return True
@@ -188,10 +329,13 @@ class KeyboardSender:
                 logger.warning(f"pygetwindow 激活失败: {e}")
 
             logger.warning(f"无法激活窗口: {window.title}")
+            # 窗口可能已失效，下次重新查找
+            self._window_cache.clear()
             return False
 
         except Exception as e:
             logger.error(f"激活窗口失败: {e}")
+            self._window_cache.clear()
             return False
 
     async def send_text(self, text: str, project_path: str = None, use_clipboard: bool = True, force_send: bool = True) -> dict:
@@ -226,7 +370,7 @@ class KeyboardSender:
         window, window_title = result
 
         # 激活窗口
-        activated = self.activate_window(window)
+        activated = await self.activate_window(window)
         if not activated and not force_send:
             return {
                 "success": False,
@@ -247,7 +391,7 @@ class KeyboardSender:
 
             # 按回车发送
             await asyncio.sleep(0.1)
-            pyautogui.press('enter')
+            _press_keys('enter')
 
             logger.info(f"命令已发送到窗口: {window_title}")
             self.last_window_handle = window
@@ -268,40 +412,43 @@ class KeyboardSender:
             }
 
     async def _send_via_clipboard(self, text: str):
-        """通过剪贴板发送文本"""
+        """通过剪贴板发送文本，发送后恢复原剪贴板中的文本"""
+        if WIN32_AVAILABLE:
+            # 直接使用 Windows API，只保存和恢复文本格式
+            original = _replace_clipboard_text(text)
+            await asyncio.sleep(0.05)
+            _press_keys('ctrl', 'v')
+            await asyncio.sleep(0.1)
+            if original is not None:
+                try:
+                    _replace_clipboard_text(original)
+                except Exception:
+                    pass
+            return
+
         try:
             import pyperclip
-            # 保存原剪贴板内容
-            original = pyperclip.paste()
+        except ImportError:
+            # 回退到键盘输入
+            await self._send_via_keyboard(text)
+            return
 
-            # 复制新内容
-            pyperclip.copy(text)
-            await asyncio.sleep(0.05)
+        # 保存原剪贴板内容
+        original = pyperclip.paste()
 
-            # 粘贴
-            pyautogui.hotkey('ctrl', 'v')
-            await asyncio.sleep(0.1)
+        # 复制新内容
+        pyperclip.copy(text)
+        await asyncio.sleep(0.05)
 
-            # 恢复原剪贴板内容
-            try:
-                pyperclip.copy(original)
-            except:
-                pass
+        # 粘贴
+        _press_keys('ctrl', 'v')
+        await asyncio.sleep(0.1)
 
-        except ImportError:
-            # 如果没有 pyperclip，使用 Windows API
-            if WIN32_AVAILABLE:
-                import win32clipboard
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(text, win32clipboard.CF_UNICODETEXT)
-                win32clipboard.CloseClipboard()
-                await asyncio.sleep(0.05)
-                pyautogui.hotkey('ctrl', 'v')
-                await asyncio.sleep(0.1)
-            else:
-                # 回退到键盘输入
-                await self._send_via_keyboard(text)
+        # 恢复原剪贴板内容
+        try:
+            pyperclip.copy(original)
+        except Exception:
+            pass
 
     async def _send_via_keyboard(self, text: str):
         """直接键盘输入（仅支持 ASCII）"""
@@ -315,11 +462,11 @@ class KeyboardSender:
             return {"success": False, "message": "未找到 Claude 窗口", "window_title": None}
 
         window, window_title = result
-        activated = self.activate_window(window)
+        activated = await self.activate_window(window)
         if not activated:
             logger.warning(f"窗口激活失败，但仍尝试发送回车: {window_title}")
 
-        pyautogui.press('enter')
+        _press_keys('enter')
         return {"success": True, "message": "已发送回车", "window_title": window_title}
 
     async def send_escape(self, project_path: str = None) -> dict:
@@ -329,11 +476,11 @@ class KeyboardSender:
             return {"success": False, "message": "未找到 Claude 窗口", "window_title": None}
 
         window, window_title = result
-        activated = self.activate_window(window)
+        activated = await self.activate_window(window)
         if not activated:
             logger.warning(f"窗口激活失败，但仍尝试发送 ESC: {window_title}")
 
-        pyautogui.press('escape')
+        _press_keys('escape')
         return {"success": True, "message": "已发送 ESC", "window_title": window_title}
 
     async def send_ctrl_c(self, project_path: str = None) -> dict:
@@ -343,11 +490,11 @@ class KeyboardSender:
             return {"success": False, "message": "未找到 Claude 窗口", "window_title": None}
 
         window, window_title = result
-        activated = self.activate_window(window)
+        activated = await self.activate_window(window)
         if not activated:
             logger.warning(f"窗口激活失败，但仍尝试发送 Ctrl+C: {window_title}")
 
-        pyautogui.hotkey('ctrl', 'c')
+        _press_keys('ctrl', 'c')
         return {"success": True, "message": "已发送 Ctrl+C", "window_title": window_title}
 
 
@@ -0,0 +1,113 @@
+"""
+BMAD GUI - PowerShell Host
+常驻 PowerShell 进程，复用同一个进程执行查询脚本
+"""
+
+import asyncio
+import logging
+import shutil
+import uuid
+from typing import Callable, Optional
+
+logger = logging.getLogger("bmad-gui")
+
+# 单个脚本的最长执行时间（秒）
+POWERSHELL_TIMEOUT = 15
+
+
+class PowerShellHost:
+    """常驻 PowerShell 进程
+
+    每次启动 powershell 都要加载 .NET 运行时（数百毫秒），这里只启动一次，
+    之后通过 stdin 写入脚本、从 stdout 读取输出，直到读到唯一的结束标记。
+    同一时间只执行一个脚本。
+    """
+
+    def __init__(self, executable: Optional[str] = None):
+        # 未指定时优先使用 PowerShell 7（pwsh），启动比 Windows PowerShell 5.1 快
+        self.executable = executable
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_started(self) -> asyncio.subprocess.Process:
+        """确保 PowerShell 进程在运行，必要时（重新）启动"""
+        if self._process and self._process.returncode is None:
+            return self._process
+
+        if self.executable is None:
+            self.executable = shutil.which("pwsh") or "powershell"
+        self._process = await asyncio.create_subprocess_exec(
+            self.executable, "-NoProfile", "-NoLogo", "-NonInteractive", "-Command", "-",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        # 输出统一使用 UTF-8，避免中文路径按系统代码页输出后乱码
+        self._process.stdin.write(b"[Console]::OutputEncoding = [System.Text.Encoding]::UTF8\n")
+        logger.info(f"PowerShell 常驻进程已启动: pid={self._process.pid}")
+        return self._process
+
+    async def run_lines(self, script: str, on_line: Callable[[str], None],
+                        timeout: float = POWERSHELL_TIMEOUT) -> None:
+        """执行脚本，每读到一行输出就交给 on_line 处理，不缓存整段输出"""
+        async with self._lock:
+            process = await self._ensure_started()
+            marker = f"__BMAD_END_{uuid.uuid4().hex}__"
+            # 空行用于结束可能跨行的语句
+            payload = f"{script}\n\nWrite-Output '{marker}'\n"
+            try:
+                process.stdin.write(payload.encode("utf-8"))
+                await process.stdin.drain()
+                await asyncio.wait_for(self._read_lines(process, marker, on_line), timeout)
+            except asyncio.CancelledError:
+                # 输出未读完，进程中残留的输出会干扰下一次查询
+                await self._kill()
+                raise
+            except (asyncio.TimeoutError, ConnectionError, EOFError) as e:
+                # 进程状态未知（可能卡住或已退出），丢弃后下次重新启动
+                logger.error(f"PowerShell 执行失败，将重启常驻进程: {e!r}")
+                await self._kill()
+                raise
+
+    async def _read_lines(self, process: asyncio.subprocess.Process, marker: str,
+                          on_line: Callable[[str], None]) -> None:
+        """逐行读取输出直到结束标记"""
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                raise EOFError("PowerShell 进程已退出")
+            text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            if text == marker:
+                return
+            on_line(text)
+
+    async def _kill(self) -> None:
+        """强制结束 PowerShell 进程"""
+        process, self._process = self._process, None
+        if process and process.returncode is None:
+            try:
+                process.kill()
+                await process.wait()
+            except ProcessLookupError:
+                pass
+
+    async def close(self) -> None:
+        """关闭 PowerShell 进程"""
+        async with self._lock:
+            process = self._process
+            if not process or process.returncode is not None:
+                self._process = None
+                return
+            try:
+                process.stdin.write(b"exit\n")
+                await process.stdin.drain()
+                process.stdin.close()
+                await asyncio.wait_for(process.wait(), timeout=3)
+                self._process = None
+            except (asyncio.TimeoutError, ConnectionError):
+                await self._kill()
+            logger.info("PowerShell 常驻进程已关闭")
+
+
+# 全局实例
+powershell_host = PowerShellHost()
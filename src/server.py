@@ -9,6 +9,7 @@ Provides static file serving, REST API, and SSE endpoints.
 import argparse
 import asyncio
 import logging
+import sys
 import webbrowser
 from pathlib import Path
 
@@ -16,8 +17,9 @@ from aiohttp import web
 
 from config import DEFAULT_PORT, STATIC_DIR
 from utils import find_available_port
-from file_ops import is_bmad_project, load_recent_projects
+from file_ops import is_bmad_project, load_recent_projects, prune_yaml_json_cache
 from watchers import start_file_watcher, stop_file_watcher
+from powershell_host import powershell_host
 from handlers.project import (
     open_project_handler, create_project_handler,
     recent_projects_handler, delete_recent_project_handler,
@@ -34,7 +36,14 @@ from handlers.claude import (
 from handlers.workflow import workflow_status_handler, sprint_status_handler, update_story_status_handler, implementation_flow_handler
 from handlers.story import get_active_story_handler, get_story_detail_handler
 from handlers.config import config_handler
-from handlers.sse import sse_handler, sse_heartbeat_task, get_sse_clients
+from handlers.sse import sse_handler, sse_heartbeat_task, close_all_sse_clients
+
+# uvloop 事件循环（可选，仅非 Windows）
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = sys.platform != "win32"
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 # 配置日志
 logging.basicConfig(
@@ -140,6 +149,9 @@ async def on_startup(app: web.Application) -> None:
     app["heartbeat_task"] = asyncio.create_task(sse_heartbeat_task())
     logger.info("SSE 心跳任务已启动")
 
+    # 清理已删除或长期未使用的项目留下的 YAML JSON 副本
+    await asyncio.to_thread(prune_yaml_json_cache)
+
     # 如果有最近项目，自动启动文件监听
     projects = await load_recent_projects()
     if projects:
@@ -166,10 +178,11 @@ async def on_shutdown(app: web.Application) -> None:
     # 停止文件监听
     await stop_file_watcher()
 
+    # 关闭常驻 PowerShell 进程
+    await powershell_host.close()
+
     # 关闭所有 SSE 连接
-    sse_clients = get_sse_clients()
-    for client in list(sse_clients):
-        sse_clients.discard(client)
+    close_all_sse_clients()
     logger.info("所有 SSE 连接已关闭")
 
 
@@ -189,6 +202,11 @@ def main() -> None:
 
     logger.info(f"Starting BMAD GUI server on port {port}")
 
+    # Windows 保持默认 Proactor 循环：Selector 循环不支持子进程管道
+    if UVLOOP_AVAILABLE:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("使用 uvloop 事件循环")
+
     app = create_app()
     app["port"] = port
     app["no_browser"] = args.no_browser
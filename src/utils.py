@@ -3,13 +3,43 @@ BMAD GUI - Utility Functions
 工具函数
 """
 
+import functools
+import json
+import os
 import socket
+import stat
+import sys
 import logging
 from pathlib import Path
 
+# orjson（可选，C 实现的 JSON 编码）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger("bmad-gui")
 
 
+def json_dumps_bytes(data) -> bytes:
+    """序列化为 UTF-8 JSON 字节串，优先使用 orjson，不转义非 ASCII 字符"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson 不支持的类型（如超出 64 位的整数）回退到标准库
+            pass
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def json_loads(data: str | bytes):
+    """解析 JSON，优先使用 orjson（解析失败同样抛出 json.JSONDecodeError）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def is_port_available(port: int) -> bool:
     """检测端口是否可用"""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -21,16 +51,50 @@ def is_port_available(port: int) -> bool:
 
 
 def find_available_port(start_port: int, max_attempts: int = 10) -> int:
-    """查找可用端口，从 start_port 开始尝试，最多尝试 max_attempts 次"""
-    for i in range(max_attempts):
-        port = start_port + i
-        if is_port_available(port):
+    """查找可用端口，从 start_port 开始尝试，最多尝试 max_attempts 次
+
+    复用同一个 socket 依次尝试 bind（bind 失败后 socket 仍处于未绑定状态）。
+    非 Windows 平台设置 SO_REUSEADDR，与 aiohttp 监听时的行为一致，
+    避免把处于 TIME_WAIT 的端口误判为占用；Windows 上该选项允许抢占
+    已监听端口，因此不设置。
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        if sys.platform != "win32":
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        for i in range(max_attempts):
+            port = start_port + i
+            try:
+                s.bind(('localhost', port))
+            except OSError:
+                continue
             if i > 0:
                 logger.warning(f"端口 {start_port} 被占用，使用端口 {port}")
             return port
     raise RuntimeError(f"无法找到可用端口（已尝试 {start_port}-{start_port + max_attempts - 1}）")
 
 
+@functools.lru_cache(maxsize=128)
+def _resolve_absolute(path_str: str) -> Path:
+    """解析绝对路径（带 LRU 缓存）"""
+    return Path(path_str).resolve()
+
+
+def resolve_path_cached(path_str: str) -> Path:
+    """解析路径（realpath），绝对路径的结果会被缓存
+
+    相对路径依赖当前工作目录（启动 PTY 时会 chdir），因此不缓存。
+    文件系统结构变化后调用 clear_path_cache() 作废缓存。
+    """
+    if os.path.isabs(path_str):
+        return _resolve_absolute(path_str)
+    return Path(path_str).resolve()
+
+
+def clear_path_cache() -> None:
+    """作废路径解析缓存"""
+    _resolve_absolute.cache_clear()
+
+
 def validate_path_safety(path_str: str) -> tuple[bool, Path | None, str]:
     """验证路径安全性并返回解析后的路径
 
@@ -40,10 +104,13 @@ def validate_path_safety(path_str: str) -> tuple[bool, Path | None, str]:
     if not path_str:
         return False, None, "INVALID_PATH"
     try:
-        path = Path(path_str).resolve()
-        if not path.exists():
+        path = resolve_path_cached(path_str)
+        # 单次 stat 同时判断存在性和目录类型
+        try:
+            st = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
             return False, None, "FILE_NOT_FOUND"
-        if not path.is_dir():
+        if not stat.S_ISDIR(st.st_mode):
             return False, None, "INVALID_PATH"
         return True, path, ""
     except (ValueError, OSError):
@@ -5,13 +5,15 @@ BMAD GUI - File Watchers
 
 import asyncio
 import logging
+import os
 from pathlib import Path
 
 import yaml
 
-from config import WATCHED_FILES
+from config import WATCHED_FILES, WATCHED_FILENAMES
+from file_ops import load_yaml_cached_async
 from handlers.sse import broadcast_sse_event, set_current_project
-from handlers.workflow import parse_workflow_status, parse_sprint_status
+from handlers.workflow import parse_workflow_status, parse_sprint_status, WORKFLOW_STATUS_KEYS
 
 logger = logging.getLogger("bmad-gui")
 
@@ -23,48 +25,67 @@ except ImportError:
     WATCHFILES_AVAILABLE = False
     logger.warning("watchfiles 未安装，文件监听功能将不可用")
 
+# watchfiles 批量合并参数（毫秒）
+WATCH_DEBOUNCE_MS = 200
+WATCH_STEP_MS = 50
+
+# 状态文件解析失败（可能仍在写入）时的重试间隔（秒）
+YAML_RETRY_DELAYS = (0.02, 0.08)
+
+# 每个状态文件最近一次广播的结果，内容未变化时不重复广播
+_last_results: dict[Path, dict] = {}
+
 # 全局变量
 file_watcher_task = None
 current_project_path: Path | None = None
 
 
+def _status_file_filter(change, path: str) -> bool:
+    """只保留状态文件的变化，其余事件在进入监听循环前丢弃"""
+    return os.path.basename(path) in WATCHED_FILENAMES
+
+
 async def watch_project_files(project_path: Path) -> None:
     """监听项目相关文件变化"""
     if not WATCHFILES_AVAILABLE:
         logger.warning("watchfiles 未安装，无法启动文件监听")
         return
 
-    watch_dirs = set()
-
-    md_dir = project_path / "md"
-    if md_dir.exists():
-        watch_dirs.add(md_dir)
-        sprint_artifacts = md_dir / "sprint-artifacts"
-        if sprint_artifacts.exists():
-            watch_dirs.add(sprint_artifacts)
-
-    watch_dirs.add(project_path)
-
-    if not watch_dirs:
+    # 状态文件可能位于项目根目录、md/ 或 md/ 下的 sprint 目录，
+    # 递归监听项目根目录即可覆盖全部位置；再单独添加子目录会重复产生事件
+    if not project_path.is_dir():
         logger.warning(f"没有可监听的目录: {project_path}")
         return
+    watch_dirs = {project_path}
 
     logger.info(f"开始监听项目文件，目录: {[str(d) for d in watch_dirs]}")
 
+    watched = WATCHED_FILES
+    handlers = _FILE_HANDLERS
+
     try:
-        async for changes in watchfiles.awatch(*watch_dirs):
+        # debounce 内的连续写入由 watchfiles 合并为一批
+        async for changes in watchfiles.awatch(
+            *watch_dirs,
+            watch_filter=_status_file_filter,
+            recursive=True,
+            debounce=WATCH_DEBOUNCE_MS,
+            step=WATCH_STEP_MS
+        ):
+            # 同一批次内同一文件只处理一次（编辑器保存常产生多次事件）
+            pending: dict[str, tuple[str, object]] = {}
             for change_type, change_path in changes:
-                change_path = Path(change_path)
-                filename = change_path.name
-
-                if filename in WATCHED_FILES:
-                    file_type = WATCHED_FILES[filename]
-                    logger.info(f"检测到文件变化: {change_type} - {change_path} (类型: {file_type})")
-
-                    if file_type == "workflow":
-                        await handle_workflow_file_change(change_path)
-                    elif file_type == "sprint":
-                        await handle_sprint_file_change(change_path)
+                file_type = watched.get(os.path.basename(change_path))
+                if file_type is None:
+                    continue
+                pending[change_path] = (file_type, change_type)
+
+            tasks = []
+            for change_path, (file_type, change_type) in pending.items():
+                logger.info(f"检测到文件变化: {change_type} - {change_path} (类型: {file_type})")
+                tasks.append(handlers[file_type](Path(change_path)))
+            if tasks:
+                await asyncio.gather(*tasks)
 
     except asyncio.CancelledError:
         logger.info("文件监听任务已取消")
@@ -72,15 +93,41 @@ async def watch_project_files(project_path: Path) -> None:
         logger.error(f"文件监听错误: {e}")
 
 
+async def _load_status_yaml(yaml_file: Path, keys: tuple[str, ...] | None = None):
+    """读取状态文件（按 mtime 和大小缓存，指定 keys 时只构造这些顶层键，见 load_yaml_cached）
+
+    写入方可能尚未写完（解析失败或文件为空），此时按 YAML_RETRY_DELAYS 重试。
+    """
+    for delay in (*YAML_RETRY_DELAYS, None):
+        try:
+            yaml_data = await load_yaml_cached_async(yaml_file, keys)
+        except yaml.YAMLError:
+            if delay is None:
+                raise
+        else:
+            if yaml_data is not None or delay is None:
+                return yaml_data
+        await asyncio.sleep(delay)
+
+
+def _result_changed(yaml_file: Path, result: dict) -> bool:
+    """记录广播结果，返回是否与上次不同"""
+    if _last_results.get(yaml_file) == result:
+        return False
+    _last_results[yaml_file] = result
+    return True
+
+
 async def handle_workflow_file_change(yaml_file: Path) -> None:
     """处理工作流状态文件变化"""
     try:
-        await asyncio.sleep(0.1)
-
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        yaml_data = await _load_status_yaml(yaml_file, WORKFLOW_STATUS_KEYS)
 
-        result = parse_workflow_status(yaml_data, current_project_path)
+        # 解析过程会检查产出文件是否存在，放到线程中与其他状态文件的处理并行
+        result = await asyncio.to_thread(parse_workflow_status, yaml_data, current_project_path)
+        if not _result_changed(yaml_file, result):
+            logger.debug(f"工作流状态未变化，跳过广播: {yaml_file}")
+            return
         await broadcast_sse_event("workflow_update", result)
         logger.info(f"已广播工作流更新")
 
@@ -93,12 +140,12 @@ async def handle_workflow_file_change(yaml_file: Path) -> None:
 async def handle_sprint_file_change(yaml_file: Path) -> None:
     """处理 Sprint 状态文件变化"""
     try:
-        await asyncio.sleep(0.1)
-
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            yaml_data = yaml.safe_load(f)
+        yaml_data = await _load_status_yaml(yaml_file)
 
-        result = parse_sprint_status(yaml_data)
+        result = await asyncio.to_thread(parse_sprint_status, yaml_data)
+        if not _result_changed(yaml_file, result):
+            logger.debug(f"Sprint 状态未变化，跳过广播: {yaml_file}")
+            return
         await broadcast_sse_event("sprint_update", result)
         logger.info(f"已广播 Sprint 更新")
 
@@ -108,11 +155,19 @@ async def handle_sprint_file_change(yaml_file: Path) -> None:
         logger.error(f"处理 Sprint 文件变化失败: {e}")
 
 
+# 文件类型 -> 变化处理函数
+_FILE_HANDLERS = {
+    "workflow": handle_workflow_file_change,
+    "sprint": handle_sprint_file_change,
+}
+
+
 async def start_file_watcher(project_path: Path) -> None:
     """启动文件监听任务"""
     global file_watcher_task, current_project_path
 
     await stop_file_watcher()
+    _last_results.clear()
 
     current_project_path = project_path
     set_current_project(project_path)
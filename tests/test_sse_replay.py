@@ -0,0 +1,69 @@
+"""
+SSE 事件 ID 与 Last-Event-ID 补发测试
+
+运行: python -m unittest discover -s tests
+"""
+
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from config import SSE_REPLAY_BUFFER_SIZE  # noqa: E402
+from handlers import sse  # noqa: E402
+
+
+def _broadcast(count: int) -> list[str]:
+    """广播 count 个事件（没有客户端，只记录），返回它们的事件 ID"""
+    async def run():
+        ids = []
+        for i in range(count):
+            await sse.broadcast_sse_event("workflow_update", {"n": i})
+            ids.append(f"{sse._event_epoch}-{sse._last_event_id}")
+        return ids
+    return asyncio.run(run())
+
+
+class MissedEventFramesTest(unittest.TestCase):
+
+    def setUp(self):
+        sse._new_event_epoch()
+        sse.current_project_path = None
+
+    def test_replays_events_after_last_id(self):
+        ids = _broadcast(3)
+        frames = sse._missed_event_frames(ids[0])
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(sse._missed_event_frames(ids[-1]), [])
+
+    def test_restart_falls_back_to_full_state(self):
+        # 重启前的 ID 序号可能小于、等于或大于新进程的序号，都不能按序号补发
+        old_ids = _broadcast(5)
+        sse._new_event_epoch()  # 相当于新进程启动
+        _broadcast(5)
+        for old_id in old_ids:
+            self.assertIsNone(sse._missed_event_frames(old_id))
+
+    def test_project_switch_falls_back_to_full_state(self):
+        sse.set_current_project(Path("/project-a"))
+        last_id = _broadcast(2)[-1]
+        sse.set_current_project(Path("/project-b"))
+        self.assertIsNone(sse._missed_event_frames(last_id))
+        _broadcast(1)
+        self.assertIsNone(sse._missed_event_frames(last_id))
+
+    def test_buffer_overflow_falls_back_to_full_state(self):
+        ids = _broadcast(SSE_REPLAY_BUFFER_SIZE + 5)
+        self.assertIsNone(sse._missed_event_frames(ids[0]))
+        self.assertEqual(len(sse._missed_event_frames(ids[-3])), 2)
+
+    def test_invalid_ids(self):
+        _broadcast(1)
+        for value in (None, "", "abc", f"{sse._event_epoch}-x", f"{sse._event_epoch}-99", f"{sse._event_epoch}--1"):
+            self.assertIsNone(sse._missed_event_frames(value))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+YAML JSON 副本清理测试
+
+运行: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import file_ops  # noqa: E402
+
+
+class PruneYamlJsonCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        patcher = mock.patch.object(file_ops, "DATA_DIR", self.root / "data")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache_dir = self.root / "data" / file_ops.YAML_JSON_CACHE_DIRNAME
+
+    def _load(self, name: str) -> Path:
+        path = self.root / name
+        path.write_text("development_status:\n  1-1-a: done\n", encoding="utf-8")
+        file_ops.load_yaml_cached(path)
+        file_ops._yaml_cache.clear()
+        return path
+
+    def test_keeps_live_entries(self):
+        path = self._load("live.yaml")
+        self.assertEqual(file_ops.prune_yaml_json_cache(), 0)
+        self.assertTrue(file_ops._json_cache_file(path, None).exists())
+
+    def test_removes_entries_for_deleted_files(self):
+        path = self._load("gone.yaml")
+        path.unlink()
+        self.assertEqual(file_ops.prune_yaml_json_cache(), 1)
+        self.assertFalse(file_ops._json_cache_file(path, None).exists())
+
+    def test_removes_old_entries_and_leftovers(self):
+        path = self._load("old.yaml")
+        cache_file = file_ops._json_cache_file(path, None)
+        old = time.time() - (file_ops.YAML_JSON_CACHE_MAX_AGE_DAYS + 1) * 86400
+        os.utime(cache_file, (old, old))
+        (self.cache_dir / "abc.123.tmp").write_bytes(b"{")
+        (self.cache_dir / "broken.json").write_bytes(b"not json")
+        self.assertEqual(file_ops.prune_yaml_json_cache(), 3)
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_missing_cache_dir(self):
+        self.assertEqual(file_ops.prune_yaml_json_cache(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()